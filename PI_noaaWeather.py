@@ -43,10 +43,18 @@ class PythonInterface(widget.Widget):
         self.name = f"{name} - {self.conf.__VERSION__}"
         self.sig = "noaaweather.xppython3"
         self.desc = "NOAA GFS Weather Data in X-Plane"
+        # flight loop cycles before building the windows, a couple of seconds after the first frame
+        self.prebuild_cycles = 120
 
     def floopCallback(self, elapsedMe, elapsedSim, counter, refcon):
         """Flight Loop Callback"""
 
+        # Build the windows hidden once the sim is running, instead of on the first menu click
+        if self.prebuild_cycles:
+            self.prebuild_cycles -= 1
+            if not self.prebuild_cycles:
+                self.prebuild_windows()
+
         # Update status window
         if (
             (self.info_window and xp.isWidgetVisible(self.info_window_widget))
@@ -56,7 +64,7 @@ class PythonInterface(widget.Widget):
 
         # Handle server misc requests
         if len(self.weather.queryResponses):
-            msg = self.weather.queryResponses.pop()
+            msg = self.weather.queryResponses.popleft()
             if 'metar' in msg:
                 self.metarQueryCallback(msg)
 
@@ -92,7 +100,8 @@ class PythonInterface(widget.Widget):
 
         if self.conf.use_real_weather_data and self.conf.download_GFS:
             if self.newAptLoaded:
-                xp.log(f" *** NEW APT LOADED ***")
+                if self.conf.verbose:
+                    xp.log(" *** NEW APT LOADED ***")
                 self.weather.reset_weather()
                 self.newAptLoaded = False
             if self.conf.set_snow:
@@ -9,11 +9,13 @@ as published by the Free Software Foundation; either version 2
 of the License, or any later version.
 """
 
+from functools import lru_cache
 from math import hypot, atan2, degrees, exp, log, radians, sin, cos, asin, sqrt, pi, isclose
 from random import random
 
 # const
 EARTH_RADIUS = 6378137  # meters
+GFS_MISSING = 9.999e19  # GFS marks missing values (over water) with 9.999e+20
 
 class c:
     """Unit conversion  and misc tools"""
@@ -72,6 +74,16 @@ class c:
     def m2fl(n) -> int:
         return False if n is False else int(n * 0.03280839895013123)
 
+    @staticmethod
+    def m2fl_column(values) -> list[int]:
+        """m2fl for a whole column of altitudes, one comprehension instead of a call per value"""
+        return [int(n * 0.03280839895013123) for n in values]
+
+    @staticmethod
+    def kel2cel_column(values) -> list[int]:
+        """Rounded kel2cel for a whole column of temperatures"""
+        return [round(n - 273.15) for n in values]
+
     @staticmethod
     def f2m(n):
         return False if n is False else n * 0.3048
@@ -142,6 +154,12 @@ class c:
         d = EARTH_RADIUS * c
         return d
 
+    @staticmethod
+    def nearest_point(latlong, points: list) -> tuple[tuple, float]:
+        """Returns the nearest of points ((lat, lon, ...) tuples) to latlong and its distance in meters"""
+        dist, i = min((c.greatCircleDistance(latlong, p[:2]), i) for i, p in enumerate(points))
+        return points[i], dist
+
     @staticmethod
     def great_circle_destination(lon1: float, lat1: float, bearing: float, dist: float = 50000) -> tuple[float, float]:
         """ Formula:	
@@ -280,7 +298,7 @@ class c:
 
     @classmethod
     def datarefTransition(cls, dataref, new, elapsed, speed=0.25, id=False):
-        """Timed dataref transition"""
+        """Timed dataref transition, returns True once the new value is reached"""
 
         # Save reference to ignore x-plane roundings
         if not id:
@@ -290,7 +308,7 @@ class c:
 
         # Return if the value is already set
         if cls.transrefs[id] == new:
-            return
+            return True
 
         current = cls.transrefs[id]
 
@@ -298,11 +316,13 @@ class c:
             dir = -1
         else:
             dir = 1
-        if abs(current - new) > speed * elapsed + speed:
+        reached = abs(current - new) <= speed * elapsed + speed
+        if not reached:
             new = current + dir * speed * elapsed
 
         cls.transrefs[id] = new
         dataref.value = new
+        return reached
 
     @classmethod
     def snowDatarefTransition(cls, dataref, new: float, elapsed, speed: float):
@@ -425,9 +445,8 @@ class c:
 
     @staticmethod
     def is_exponential(f: float) -> bool:
-        if isinstance(f,float) and 'e' in str(f).lower():
-            return True
-        return False
+        """True if f is the GFS missing value"""
+        return isinstance(f, float) and f >= GFS_MISSING
 
     @staticmethod
     def limit(value, max=None, min=None):
@@ -519,8 +538,10 @@ class c:
         return false_label if i is False else f"{i:03.0F}"
 
     @classmethod
+    @lru_cache(maxsize=32, typed=True)
     def convertForInput(cls, value, conversion, toFloat=False, false_str='none'):
-        # Make conversion and transform to int
+        # Make conversion and transform to int, cached as the config window shows the same values on each update
+        # typed, so False (none) and 0 don't share an entry
         if value is False:
             value = False
         else:
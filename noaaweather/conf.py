@@ -24,6 +24,8 @@ class Conf:
     """Loads and saves configuration variables"""
     syspath, dirsep = '', os.sep
     printableChars = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~ '
+    # str.translate table deleting the ASCII characters not in printableChars
+    unprintable_table = str.maketrans('', '', bytes(range(128)).decode('ascii').translate(str.maketrans('', '', printableChars)))
 
     __VERSION__ = '12.1'
 
@@ -59,6 +61,9 @@ class Conf:
         self.dbfile = Path(self.cachepath, 'metar', 'metar.db')
         self.dbfile.parent.mkdir(parents=True, exist_ok=True)
 
+        # weather data exchange buffer between server and plugin
+        self.shmfile = Path(self.cachepath, 'weatherdata.shm')
+
         self.setDefaults()
         self.pluginLoad()
         self.serverLoad()
@@ -196,6 +201,7 @@ class Conf:
         self.server_updaterate = 10  # Run the weather loop each #seconds
         self.server_address = '127.0.0.1'
         self.server_port = 8950
+        self.shm_size = 4 << 20  # weather data shared buffer size in bytes
 
         # Weather server variables
         self.lastgrib = False
@@ -54,6 +54,7 @@ class Database:
         queries = [
             ''' CREATE TABLE IF NOT EXISTS source 
                 (icao text KEY UNIQUE, lat real, lon real, elevation int, timestamp int KEY, metar text);''',
+            ''' CREATE INDEX IF NOT EXISTS source_lat ON source (lat);''',
             ''' CREATE TABLE IF NOT EXISTS realweather 
                             (icao text KEY UNIQUE, metar text);'''
         ]
@@ -214,12 +214,24 @@ class EasyDref:
         else:
             self.__dict__[name] = value
 
-    def change_if_diff(self, value) -> bool:
+    def change_if_diff(self, value, max_diff=False) -> bool:
+        """ Set the Dataref if the current value differs (by more than max_diff if given)
+            Returns True if value was updated """
+        if max_diff is not False:
+            return self.change_if_margin(value, max_diff)
         if self.value != value:
             self.set(value)
             return True
         return False
 
+    def change_if_margin(self, value, max_diff) -> bool:
+        """ Set the Dataref if the current value differs by more than max_diff
+            Returns True if value was updated """
+        if abs(self.value - value) > max_diff:
+            self.set(value)
+            return True
+        return False
+
     def set_default(self):
         if self.default_value and self.value != self.default_value:
             self.set(self.default_value)
@@ -22,7 +22,6 @@ class GFS(GribWeatherSource):
     base_url = 'https://nomads.ncep.noaa.gov/pub/data/nccf/com/gfs/prod/gfs.'
 
     download = False
-    download_wait = 0
 
     def __init__(self, conf):
         self.variable_list = conf.gfs_variable_list
@@ -177,11 +176,8 @@ class GFS(GribWeatherSource):
             data = self.parse_grib_data(filepath, new_lat, new_lon)
             val = data['surface'].get('snow')
             if val is not None and not c.is_exponential(val):
-                prediction = {
-                    'lat': new_lat,
-                    'lon': new_lon,
-                    'depth': val
-                }
+                # (lat, lon, depth)
+                prediction = (new_lat, new_lon, val)
                 gfs['surface']['prediction'] = prediction
                 return
             v += 45
@@ -195,11 +191,8 @@ class GFS(GribWeatherSource):
             data = self.parse_grib_data(filepath, new_lat, new_lon)
             val = data['surface'].get('snow')
             if val is not None and not c.is_exponential(val):
-                prediction = {
-                    'lat': new_lat,
-                    'lon': new_lon,
-                    'depth': val
-                }
+                # (lat, lon, depth)
+                prediction = (new_lat, new_lon, val)
                 gfs['surface']['prediction'] = prediction
                 print(f"check_snow_values: prediction: {prediction}")
                 return
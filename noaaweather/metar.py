@@ -48,6 +48,8 @@ class Metar(WeatherSource):
     IVAO_METAR_URL = 'https://api.ivao.aero/v2/airports/all/metar'
 
     STATION_UPDATE_RATE = 30  # In days
+    # latitude band searched first for the closest station, in degrees
+    closest_station_band = 2
 
     table = 'source'
 
@@ -191,12 +193,18 @@ class Metar(WeatherSource):
 
         q = '''SELECT * FROM source
                     WHERE {}
-                    ORDER BY ((? - lat) * (? - lat) + (? - lon) * (? - lon) * ?)'''.format(cond)
-        bindings.extend([lat, lat, lon, lon, fudge])
+                    ORDER BY ((? - lat) * (? - lat) + (? - lon) * (? - lon) * ?) LIMIT 1'''
+        order = [lat, lat, lon, lon, fudge]
+        band = self.closest_station_band
 
         with self.db.session() as db:
-            res = db.execute(q, (tuple(bindings)))
+            # Search a latitude band first, using the lat index instead of sorting every station.
+            # Stations out of the band are farther than the band width: search them only if needed
+            res = db.execute(q.format(cond + 'AND lat BETWEEN ? AND ? '), (*bindings, lat - band, lat + band, *order))
             ret = res.fetchone()
+            if not ret or (lat - ret[1]) ** 2 + (lon - ret[2]) ** 2 * fudge > band ** 2:
+                res = db.execute(q.format(cond), (*bindings, *order))
+                ret = res.fetchone()
         return ret
 
     def get_metar(self, icao: str) -> tuple[str, str]:
@@ -374,6 +382,9 @@ class Metar(WeatherSource):
 
     def run(self, elapsed: int):
 
+        # poll pending downloads every elapsed seconds
+        self.next_run = time.time() + elapsed
+
         # Update stations table if required
         if self.ms_download:
             if not self.ms_download.pending():
@@ -420,6 +431,20 @@ class Metar(WeatherSource):
                 self.last_timestamp = timestamp
                 self.download_cycle(cycle, timestamp)
 
+        if not (self.ms_download or self.download):
+            # sleep until the next METAR.rwx update or METAR download
+            self.next_run = self.next_update()
+
+    def next_update(self) -> float:
+        """Returns the epoch time of the next METAR.rwx update or METAR download"""
+        updaterate = self.conf.metar_updaterate * 60
+        due = [time.time() + updaterate]
+        if self.conf.update_rwx_file and not self.conf.metar_use_xp12:
+            due.append(self.next_metarRWX)
+        if self.conf.download_METAR:
+            due.append(self.last_timestamp + updaterate + 1)
+        return min(due)
+
     def download_cycle(self, cycle, timestamp):
         self.downloading = True
         self.cache_path.mkdir(parents=True, exist_ok=True)
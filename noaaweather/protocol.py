@@ -0,0 +1,117 @@
+"""
+X-plane NOAA GFS weather plugin.
+Copyright (C) 2021-2024 Antonio Golfari
+---
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or any later version.
+"""
+
+import marshal
+
+from array import array
+
+
+class Protocol:
+    """Weather server to plugin messages encoding
+
+    Every message starts with a tag byte:
+        b'!'    control message, ascii text follows (!pong, !bye, !shm)
+        b'D'    data message, a format version byte and a marshal encoded dict follow
+
+    Weather layers follow a fixed schema and travel as one packed double column per field,
+    plugin side they are restored as array('d').
+    Both processes run the same python executable, so the marshal format always matches.
+    """
+
+    CONTROL = b'!'
+    DATA = b'D'
+    # bump when the layer schemas or the data layout change
+    VERSION = 1
+    DATA_HEADER = DATA + bytes((VERSION,))
+
+    # layer schemas: one column per field
+    LAYERS = {
+        'winds': ('alt', 'hdg', 'speed', 'temp', 'dev'),
+        'clouds': ('base', 'top', 'cover'),
+        'turbulence': ('alt', 'value'),
+    }
+    LAYER_SECTIONS = ('rw', 'wafs')
+
+    @staticmethod
+    def control(msg: str) -> bytes:
+        return b'!' + msg[1:].encode('ascii')
+
+    @classmethod
+    def encode(cls, data: dict) -> bytes:
+        """Encodes a data message, layer sections are packed in copies, data is left untouched"""
+        packed = {section: cls.pack_layers(data[section]) for section in cls.LAYER_SECTIONS if data.get(section)}
+        if packed:
+            data = {**data, **packed}
+        return cls.DATA_HEADER + marshal.dumps(data)
+
+    @classmethod
+    def decode(cls, msg) -> str | dict:
+        """Decodes a server message, returns the control string or the data dict
+        Any malformed message raises ValueError
+        """
+        tag = msg[:1]
+        if tag == cls.CONTROL:
+            try:
+                return f"!{bytes(msg[1:]).decode('ascii')}"
+            except UnicodeDecodeError as e:
+                raise ValueError(f"Malformed control message: {e}") from e
+        if tag != cls.DATA:
+            raise ValueError(f"Unknown message tag: {bytes(tag)}")
+        if len(msg) < 3:
+            raise ValueError(f"Data message too short: {len(msg)} bytes")
+        if msg[1] != cls.VERSION:
+            raise ValueError(f"Weather server data format {msg[1]} doesn't match plugin format {cls.VERSION}")
+        try:
+            data = marshal.loads(msg[2:])
+        except (EOFError, TypeError) as e:
+            raise ValueError(f"Malformed data message: {e!r}") from e
+        if not isinstance(data, dict):
+            raise ValueError(f"Malformed data message: expected dict, got {type(data).__name__}")
+        for section in cls.LAYER_SECTIONS:
+            if data.get(section):
+                cls.check_layers(data[section])
+                cls.unpack_layers(data[section])
+        return data
+
+    @classmethod
+    def pack_layers(cls, section: dict) -> dict:
+        """Returns a copy of section with wind, cloud and turbulence layers as packed double columns"""
+        data = dict(section)
+        if 'winds' in data:
+            data['winds'] = [(alt, hdg, speed, extra['temp'], extra['dev']) for alt, hdg, speed, extra in data['winds']]
+        for name, fields in cls.LAYERS.items():
+            if name in data:
+                rows = data[name]
+                cols = zip(*rows) if rows else ([] for _ in fields)
+                data[name] = {field: array('d', col).tobytes() for field, col in zip(fields, cols)}
+        return data
+
+    @classmethod
+    def check_layers(cls, data):
+        """Raises ValueError unless data has the shape of a packed layer section"""
+        if not isinstance(data, dict):
+            raise ValueError(f"Malformed data section: expected dict, got {type(data).__name__}")
+        for name in cls.LAYERS:
+            columns = data.get(name)
+            if name in data and not (isinstance(columns, dict)
+                                     and all(isinstance(packed, bytes) and not len(packed) % 8
+                                             for packed in columns.values())):
+                raise ValueError(f"Malformed {name} layers")
+
+    @classmethod
+    def unpack_layers(cls, data: dict):
+        """Restores packed columns as array('d')"""
+        for name in cls.LAYERS:
+            if name in data:
+                columns = data[name]
+                for field, packed in columns.items():
+                    col = array('d')
+                    col.frombytes(packed)
+                    columns[field] = col
@@ -376,6 +376,9 @@ class RealWeather(GribWeatherSource):
     def run(self, elapsed):
         """ Updates METAR.rwx file from XP12 realweather metar files if option to do so is checked"""
 
+        # look for new XP12 metar files every check interval
+        self.next_run = time.time() + self.rwmetar_check_interval
+
         if self.time_to_update_rwmetar:
             # update real weather metar database
             print("Updating Real Weather DB ...")
@@ -392,6 +395,7 @@ class RealWeather(GribWeatherSource):
                     print('There was an issue trying to update METAR.rwx file using XP12 Real Weather METAR files. Retrying in 30 seconds')
                     # Retry in 30 sec
                     self.next_rwmetar = time.time() + 30
+            self.next_run = self.next_rwmetar
 
     def shutdown(self):
         super().shutdown()
@@ -0,0 +1,121 @@
+"""
+X-plane NOAA GFS weather plugin.
+Copyright (C) 2021-2024 Antonio Golfari
+---
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or any later version.
+"""
+
+import mmap
+import struct
+import time
+
+from pathlib import Path
+
+
+class SharedBuffer:
+    """Memory mapped file shared by the weather server and the plugin client
+
+    The server writes the serialized weather data in the buffer and only sends a short
+    notification over UDP, the client reads the payload in place.
+    Layout: 4 bytes little endian sequence number, 4 bytes payload length, payload.
+    The sequence is odd while a write is in progress, so readers can skip payloads
+    they already decoded and detect the ones overwritten while reading.
+    The writer seeds the sequence from the clock, so a restarted server doesn't repeat
+    the sequence numbers a running client has already seen.
+    """
+
+    header = struct.Struct('<II')
+
+    def __init__(self, file: Path, size: int = 4 << 20, create: bool = False, log=print):
+        self.file = file
+        self.size = size
+        self.log = log
+        self.f = None
+        self.buf = None
+        self.seq = 0
+        # mapping errors are logged once until the buffer is mapped
+        self.error_logged = False
+
+        if create:
+            self.create()
+
+    def create(self):
+        """Allocates the whole buffer, an empty header means no data available
+        The file may still be mapped by a previous plugin or server, so it's never truncated:
+        it's only extended if too small and the header is cleared
+        """
+        # milliseconds run well ahead of the write rate, even and 32 bits wide
+        self.seq = int(time.time() * 1000) & 0xFFFFFFFE
+        try:
+            try:
+                f = open(self.file, 'r+b')
+            except FileNotFoundError:
+                f = open(self.file, 'w+b')
+            with f:
+                if f.seek(0, 2) < self.size:
+                    f.truncate(self.size)
+                f.seek(0)
+                f.write(bytes(self.header.size))
+        except OSError as e:
+            self.log(f"Can't create {self.file.name}: {e}")
+
+    def open(self) -> bool:
+        """Maps the file in memory, returns False if it's not available yet"""
+        if self.buf is not None:
+            return True
+        try:
+            self.f = open(self.file, 'r+b')
+            self.buf = mmap.mmap(self.f.fileno(), self.size)
+        except (OSError, ValueError) as e:
+            if not self.error_logged:
+                self.log(f"Can't map {self.file.name}: {e}")
+                self.error_logged = True
+            self.close()
+            return False
+        self.error_logged = False
+        return True
+
+    def write(self, payload: bytes) -> bool:
+        """Writes the payload in the buffer, returns False if it doesn't fit"""
+        n = len(payload)
+        if n + self.header.size > self.size or not self.open():
+            return False
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        self.header.pack_into(self.buf, 0, self.seq, 0)
+        self.buf[self.header.size:self.header.size + n] = payload
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        self.header.pack_into(self.buf, 0, self.seq, n)
+        return True
+
+    def read(self) -> memoryview | None:
+        """Returns a view of the latest payload, None if there's nothing new"""
+        if not self.open():
+            return None
+        seq, n = self.header.unpack_from(self.buf, 0)
+        if not seq:
+            # cleared by a starting server, its first payload is new whatever its sequence
+            self.seq = 0
+        if not n or seq & 1 or seq == self.seq:
+            return None
+        self.seq = seq
+        return memoryview(self.buf)[self.header.size:self.header.size + n]
+
+    def consistent(self) -> bool:
+        """True if the payload returned by the last read wasn't overwritten meanwhile"""
+        seq, _ = self.header.unpack_from(self.buf, 0)
+        return seq == self.seq
+
+    def close(self):
+        if self.buf is not None:
+            try:
+                self.buf.close()
+            except BufferError:
+                # a view is still exported, let the GC release it
+                pass
+            self.buf = None
+        if self.f:
+            self.f.close()
+            self.f = None
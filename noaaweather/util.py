@@ -13,8 +13,9 @@ import shutil
 import sys
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from textwrap import wrap
+from textwrap import TextWrapper
 
 
 class util:
@@ -82,9 +83,24 @@ class util:
         return lines
 
     @staticmethod
-    def format_text(text: str, max_len: int = 80, indent: int = 0, hanging: int = 0) -> list:
+    @lru_cache(maxsize=16)
+    def format_text(text: str, max_len: int = 80, indent: int = 0, hanging: int = 0) -> tuple[str, ...]:
+        """Wraps text in lines, METARs change hourly so the last layouts are cached"""
+        return tuple(util.text_wrapper(max_len, indent, hanging).wrap(text))
 
-        return wrap(text, width=max_len, initial_indent=' ' * indent, subsequent_indent=' ' * (indent + hanging))
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def text_wrapper(max_len: int, indent: int, hanging: int) -> TextWrapper:
+        """One wrapper per layout, METAR groups are never split on hyphens"""
+        return TextWrapper(
+            width=max_len, initial_indent=' ' * indent, subsequent_indent=' ' * (indent + hanging),
+            break_on_hyphens=False
+        )
+
+    @staticmethod
+    def join_groups(items: list, size: int) -> list:
+        """Joins items in lines of size elements"""
+        return [''.join(items[i:i + size]) for i in range(0, len(items), size)]
 
     @staticmethod
     def date_in_filename(file: Path) -> int:
@@ -10,8 +10,7 @@ of the License, or any later version.
 """
 
 import re
-
-from datetime import datetime, timedelta
+import time
 
 from . import c
 from .weathersource import GribWeatherSource
@@ -38,7 +37,6 @@ class WAFS(GribWeatherSource):
         '150',   # ~ FL440
     ]
 
-    download_wait = 0
     grib_conf_var = 'lastwafsgrib'
 
     RE_PRAM = re.compile(r'\bparmcat=(?P<parmcat>[0-9]+) parm=(?P<parm>[0-9]+)')
@@ -54,26 +52,14 @@ class WAFS(GribWeatherSource):
     @classmethod
     def get_cycle_date(cls) -> tuple[str, int, int]:
         """Returns last cycle date available"""
-        now = datetime.utcnow()
-
-        cnow = now - timedelta(**cls.publish_delay)
-        # Get last cycle
-        for cycle in cls.cycles:
-            if cnow.hour >= cycle:
-                lcycle = cycle
-        # Forecast
-        adjs = 0
-        if cnow.day != now.day:
-            adjs = +24
-        # Elapsed from cycle
-        forecast = (adjs + now.hour - lcycle)
+        cdate, lcycle, forecast = cls.last_cycle()
         # Get current forecast
         for fcast in cls.forecasts:
             if forecast <= fcast:
                 forecast = fcast
                 break
 
-        return f"{cnow.year}{cnow.month:02}{cnow.day:02}{lcycle:02}", lcycle, forecast
+        return f"{time.strftime('%Y%m%d', cdate)}{lcycle:02}", lcycle, forecast
 
     def parse_grib_data(self, filepath, lat: float, lon: float) -> dict:
         """Executes wgrib2 and parses its output
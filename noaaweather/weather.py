@@ -12,16 +12,27 @@ as published by the Free Software Foundation; either version 2
 of the License, or any later version.
 """
 
+import json
 import os
-import pickle
+import platform
+import select
 import socket
 import threading
 import subprocess
+import time
 
+from collections import deque, namedtuple
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
 from . import xp, c, dref, util
+from .sharedbuffer import SharedBuffer
+from .protocol import Protocol
+from .c import GFS_MISSING
+
+# a valid GFS snow depth and its position
+NearestSnow = namedtuple('NearestSnow', 'lat lon depth')
 
 
 class Weather:
@@ -44,13 +55,33 @@ class Weather:
         self.weatherClientThread = False
 
         self.windAlts = -1
-        self.nearest_snow = False
+        self.nearest_snow = None
+
+        # last setSnow inputs and computed dref values
+        self.snow_inputs = None
+        self.snow_params = None
+        # no snow around and default values injected
+        self.snow_defaults = False
+
+        # last weatherInfo output and its inputs
+        self.info_cache = None
 
-        # Response queue for user queries
-        self.queryResponses = []
+        # Response queue for user queries, oldest responses are dropped if not consumed
+        self.queryResponses = deque(maxlen=64)
 
         # Create client socket
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # avoid kernel drops on bursts of server messages, the OS may cap the requested size
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        if self.conf.verbose:
+            xp.log(f"Weather client receive buffer: {self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} bytes")
+        self.recv_buffer = bytearray(1024 * 64)
+        self.recv_view = memoryview(self.recv_buffer)
+        # server messages we couldn't decode are logged once
+        self.decode_error_logged = False
+
+        # Weather data shared buffer, mapped on first server notification
+        self.shm = SharedBuffer(self.conf.shmfile, self.conf.shm_size, log=xp.log)
 
         self.die = threading.Event()
         self.lock = threading.Lock()
@@ -61,6 +92,7 @@ class Weather:
 
     def startWeatherClient(self):
         if not self.weatherClientThread:
+            self.die.clear()
             self.weatherClientThread = threading.Thread(target=self.weatherClient)
             self.weatherClientThread.start()
 
@@ -70,21 +102,68 @@ class Weather:
         # Send something for windows to bind
         self.weatherClientSend('!ping')
 
-        while True:
-            received = self.sock.recv(1024 * 8)
-            wdata = pickle.loads(received)
-            if self.die.is_set() or wdata == '!bye':
-                break
-            elif 'info' not in wdata:
-                # A metar query response
-                self.queryResponses.append(wdata)
-            else:
-                self.weatherData = wdata
+        running = True
+        while running and not self.die.is_set():
+            latest = None
+            for wdata in self.weatherClientReceive():
+                if self.die.is_set() or wdata == '!bye':
+                    running = False
+                    break
+                elif wdata == '!shm' or 'info' in wdata:
+                    # older weather data in the same batch is superseded
+                    latest = wdata
+                else:
+                    # A metar query response
+                    self.queryResponses.append(wdata)
+
+            if running and latest == '!shm':
+                # weather data is waiting in the shared buffer
+                # a payload overwritten while decoding is dropped, its own notification follows
+                view = self.shm.read()
+                if view is None:
+                    latest = None
+                else:
+                    try:
+                        latest = Protocol.decode(view)
+                    except ValueError:
+                        # torn bytes, the payload was overwritten while decoding
+                        latest = None
+                    view.release()
+                    if not self.shm.consistent():
+                        latest = None
+            if running and latest:
+                self.weatherData = latest
                 self.newData = True
+                self.info_cache = None
+                self.snow_defaults = False
+
+        self.shm.close()
+
+    def weatherClientReceive(self, limit: int = 16) -> list:
+        """Waits for a server message, then drains up to limit datagrams already queued"""
+        # wake up periodically to check for shutdown, the server could be gone without a !bye
+        while not select.select([self.sock], [], [], 0.5)[0]:
+            if self.die.is_set():
+                return []
+        server = (self.conf.server_address, self.conf.server_port)
+        messages = []
+        while True:
+            nbytes, sender = self.sock.recvfrom_into(self.recv_buffer)
+            if sender == server:
+                # only datagrams from the weather server reach marshal
+                try:
+                    messages.append(Protocol.decode(self.recv_view[:nbytes]))
+                except ValueError as e:
+                    # unknown tag or format version, e.g. a server left running by another plugin build
+                    if not self.decode_error_logged:
+                        xp.log(f"Skipping weather server message: {e}")
+                        self.decode_error_logged = True
+            if len(messages) >= limit or not select.select([self.sock], [], [], 0)[0]:
+                return messages
 
     def weatherClientSend(self, msg):
         if self.weatherClientThread:
-            self.sock.sendto(msg.encode('utf-8'), ('127.0.0.1', self.conf.server_port))
+            self.sock.sendto(msg.encode('utf-8'), (self.conf.server_address, self.conf.server_port))
 
     def startWeatherServer(self):
         DETACHED_PROCESS = 0x00000008
@@ -93,18 +172,26 @@ class Weather:
         try:
             if self.conf.spinfo:
                 kwargs.update({'startupinfo': self.conf.spinfo, 'creationflags': DETACHED_PROCESS})
-            xp.log(f"Starting Weather Server using: {args} {kwargs}")
+            if self.conf.verbose:
+                xp.log(f"Starting Weather Server using: {args} {kwargs}")
             subprocess.Popen(args, **kwargs)
         except Exception as e:
-            print(f"Exception while executing subprocess: {e}")
+            xp.log(f"Exception while executing subprocess: {e}")
 
     def shutdown(self):
         # Shutdown client and server
         self.weatherClientSend('!shutdown')
+        self.die.set()
         self.weatherClientThread = False
 
     def get_XP12_METAR(self, icao: str) -> str:
-        return xp.getMETARForAirport('icao')
+        # XP12 METARs don't change within the minute
+        return self.xp12_metar(icao, int(time.monotonic() // 60))
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def xp12_metar(icao: str, minute: int) -> str:
+        return xp.getMETARForAirport(icao)
 
     def setSnow(self, elapsed):
         """ Set snow cover
@@ -133,49 +220,44 @@ class Weather:
         temp = c.kel2cel(data['temp'])
         transitions_speed = 0.25 if self.data.on_ground else 0.01
 
+        if snow == 0 and self.snow_defaults and self.nearest_snow is None:
+            # nothing to inject until new data arrives
+            return
+
         # over water, or where is not received, GFS data have a value of 9.999e+20
         # if there is already a snow value, it will keep that one in a radius of 300nm, 
         # until a new valid value is acquired, otherwise will stop injecting a value in the dref
-        if c.is_exponential(snow):
+        if snow >= GFS_MISSING:
             # we are probably over water or very close to water
             snow = 0
-            if data.get('prediction'):
-                # a suitable value is found nearby or along the track
-                if not self.nearest_snow:
-                    # save new nearest snow value
-                    self.nearest_snow = data['prediction']
-                else:
-                    # check if we have a better prediction
-                    nlat, nlon, nsnow = self.nearest_snow.values()
-                    plat, plon, _ = data['prediction'].values()
-                    if (nlat, nlon) != (plat, plon):
-                        ndist = c.greatCircleDistance((lat, lon), (nlat, nlon))
-                        pdist = c.greatCircleDistance((lat, lon), (plat, plon))
-                        if pdist < ndist:
-                            self.nearest_snow = data['prediction']
-
-            if self.nearest_snow:
-                # we can use latest recorded snow value if near enough
-                nlat, nlon, nsnow = self.nearest_snow.values()
-                dist = c.m2nm(c.greatCircleDistance((lat, lon), (nlat, nlon)))  # in nm
-                if dist < 70:
-                    snow = nsnow
+            # candidates: latest recorded snow value and the ones found nearby or along the track
+            candidates = [self.nearest_snow] if self.nearest_snow is not None else []
+            prediction = data.get('prediction')
+            if prediction:
+                predictions = prediction if isinstance(prediction, list) else [prediction]
+                candidates += [NearestSnow(*p) for p in predictions]
+
+            if candidates:
+                # keep the nearest one, we can use it if near enough
+                self.nearest_snow, dist = c.nearest_point((lat, lon), candidates)
+                if c.m2nm(dist) < 70:
+                    snow = self.nearest_snow.depth
                 else:
                     # delete old nearest value
-                    self.nearest_snow = False
+                    self.nearest_snow = None
         elif snow == 0:
-            self.nearest_snow = False
+            self.nearest_snow = None
         elif snow > 0:
-            self.nearest_snow = {
-                'lat': lat,
-                'lon': lon,
-                'depth': snow
-            }
+            self.nearest_snow = NearestSnow(lat, lon, snow)
 
         if snow > 0:
-            # calculating a factor based on latitude and temperature
-            factor = max(-20, abs(lat) - 55 - max(0, 0.2 * temp))
-            val = max(3.8 * (1 - 0.005 * factor - snow**0.04), 0.05)
+            # snow parameters only change with a new GFS value or a different position
+            inputs = (round(snow, 3), round(lat, 1), round(temp, 1))
+            if inputs != self.snow_inputs:
+                self.snow_inputs = inputs
+                self.snow_params = self.snow_parameters(*inputs)
+            frozen_factor, val, noise, scale, width, ice, puddles = self.snow_params
+
             rw_val = self.data.snow_cover.value
             if val < rw_val:
                 # injecting snow_cover value
@@ -185,23 +267,11 @@ class Weather:
                     xp.log(f"ERROR injecting snow_cover: {e}")
             else:
                 # no need to inject a different value
-                val = self.data.snow_cover.value
-
-            # calculating all other drefs
-            frozen_water = min(5 * max(0, factor)**1.5 * val, 1000)
-            noise = 0.15 - 0.005*factor
-            scale = noise*2000
-            width = noise*3
+                val = rw_val
 
-            # adding ice based on temperature and snow (total wild guess)
-            # from 2 to 0.01, inversely proportional to factor
-            ice = 2 if temp > 4 else 0.00025*factor**2 - 0.045*factor + 1
-            self.data.iced_tarmac.value = ice
-
-            # adding standing water, as probably the tarmac is treated with addictives
-            # from 1.25 to 0.01, inversely proportional to factor, proportional to val
-            puddles = min(1.25, 1.15 - 0.5*ice)
-            self.data.puddles.value = puddles
+            frozen_water = min(frozen_factor * val, 1000)
+            self.data.iced_tarmac.change_if_diff(ice)
+            self.data.puddles.change_if_diff(puddles)
 
         else:
             # default values
@@ -211,242 +281,242 @@ class Weather:
             width = self.data.tarmac_snow_width.default_value
 
         # inject values
-        c.datarefTransition(self.data.frozen_water, frozen_water, elapsed=elapsed, speed=transitions_speed)
-        self.setDrefIfDiff(self.data.tarmac_snow_noise, noise)
-        self.setDrefIfDiff(self.data.tarmac_snow_scale, scale)
-        self.setDrefIfDiff(self.data.tarmac_snow_width, width)
-
-    def setDrefIfDiff(self, dref, value, max_diff=False):
-        """ Set a Dataref if the current value differs
-            Returns True if value was updated """
-
-        if max_diff is not False:
-            if abs(dref.value - value) > max_diff:
-                dref.value = value
-                return True
-        else:
-            if dref.value != value:
-                dref.value = value
-                return True
-        return False
+        reached = c.datarefTransition(self.data.frozen_water, frozen_water, elapsed=elapsed, speed=transitions_speed)
+        self.data.tarmac_snow_noise.change_if_diff(noise)
+        self.data.tarmac_snow_scale.change_if_diff(scale)
+        self.data.tarmac_snow_width.change_if_diff(width)
+        self.snow_defaults = snow <= 0 and reached
+
+    @staticmethod
+    def snow_parameters(snow: float, lat: float, temp: float) -> tuple:
+        """Returns snow related dref values for a given snow depth, latitude and temperature"""
+
+        # calculating a factor based on latitude and temperature
+        factor = max(-20, abs(lat) - 55 - max(0, 0.2 * temp))
+        val = max(3.8 * (1 - 0.005 * factor - snow**0.04), 0.05)
+
+        # calculating all other drefs
+        noise = 0.15 - 0.005*factor
+        scale = noise*2000
+        width = noise*3
+
+        # adding ice based on temperature and snow (total wild guess)
+        # from 2 to 0.01, inversely proportional to factor
+        ice = 2 if temp > 4 else 0.00025*factor**2 - 0.045*factor + 1
+
+        # adding standing water, as probably the tarmac is treated with addictives
+        # from 1.25 to 0.01, inversely proportional to factor, proportional to val
+        puddles = min(1.25, 1.15 - 0.5*ice)
+
+        # frozen water is proportional to the snow_cover value actually injected
+        frozen_factor = 5 * max(0, factor)**1.5
+
+        return frozen_factor, val, noise, scale, width, ice, puddles
 
     def reset_weather(self):
-        if self.nearest_snow:
-            # reset nearest snow value
-            self.nearest_snow = False
+        # reset nearest snow value
+        self.nearest_snow = None
+        self.snow_inputs = None
+        self.snow_defaults = False
         c.transitionClearReferences()
 
     def weatherInfo(self, chars: int = 80) -> list[str]:
-        """Return an array of strings with formatted weather data"""
-        verbose = self.conf.verbose
-        sysinfo = [f"XPNoaaWeather for XP12 {self.conf.__VERSION__} Status:"]
+        """Return an array of strings with formatted weather data
+            The status window asks for it every frame: lines are rebuilt on new data,
+            position or friction changes, and at least every second for live parameters"""
+        data = self.data
+        # position is read once, for the cache key and the status lines
+        position = data.latdr.value, data.londr.value
+        key = (
+            id(self.weatherData), chars, int(time.monotonic()),
+            round(position[0], 2), round(position[1], 2), data.runwayFriction.get()
+        )
+        if self.info_cache is None or self.info_cache[0] != key:
+            self.info_cache = key, self.buildWeatherInfo(chars, position)
+        # callers may consume the list
+        return list(self.info_cache[1])
+
+    def buildWeatherInfo(self, chars: int = 80, position: tuple[float, float] | None = None) -> list[str]:
+        """Formats weather data and live parameters in lines of chars
+            position is the (lat, lon) already read by the caller"""
+        conf, data = self.conf, self.data
+        verbose = conf.verbose
+        use_rw = conf.use_real_weather_data
+        sysinfo = [f"XPNoaaWeather for XP12 {conf.__VERSION__} Status:"]
+        append, extend = sysinfo.append, sysinfo.extend
+        m2fl, m2ft, kel2cel = c.m2fl, c.m2ft, c.kel2cel
 
         if not self.weatherData:
-            sysinfo += ['* Data not ready. Please wait...']
+            append('* Data not ready. Please wait...')
         else:
             wdata = self.weatherData
-            if 'info' in wdata:
-                lat, lon = self.data.latdr.value, self.data.londr.value
-                sysinfo += [
-                    '   LAT: %.2f/%.2f LON: %.2f/%.2f FL: %02.f MAGNETIC DEV: %.2f' % (
-                        lat, wdata['info']['lat'], lon, wdata['info']['lon'],
-                        c.m2ft(self.data.altdr.value) / 100, self.data.mag_deviation.value)
-                ]
-                if not self.data.real_weather_enabled:
-                    sysinfo += [f"   XP12 Real Weather is not active (value = {self.data.xp_weather_source.value})"]
-                elif 'None' in wdata['info']['gfs_cycle']:
-                    sysinfo += ['   XP12 is still downloading weather info ...']
-                elif self.conf.use_real_weather_data:
-                    sysinfo += [f"   GFS Cycle: {wdata['info']['rw_gfs_cycle']}"]
+            info = wdata.get('info', {})
+            if info:
+                lat, lon = position or (data.latdr.value, data.londr.value)
+                xp_alt = m2ft(data.altdr.value) / 100
+                mag_dev = data.mag_deviation.value
+                append('   LAT: %.2f/%.2f LON: %.2f/%.2f FL: %02.f MAGNETIC DEV: %.2f' % (
+                    lat, info['lat'], lon, info['lon'], xp_alt, mag_dev))
+                if not data.real_weather_enabled:
+                    append(f"   XP12 Real Weather is not active (value = {data.xp_weather_source.value})")
+                elif 'None' in info['gfs_cycle']:
+                    append('   XP12 is still downloading weather info ...')
+                elif use_rw:
+                    append(f"   GFS Cycle: {info['rw_gfs_cycle']}")
                 else:
-                    sysinfo += [f"   GFS Cycle: {wdata['info']['gfs_cycle']}"]
+                    append(f"   GFS Cycle: {info['gfs_cycle']}")
 
-            if 'metar' in wdata and 'icao' in wdata['metar']:
-                sysinfo += [
-                    '',
-                    f"{self.conf.metar_source} METAR:"
-                ]
+            metar = wdata.get('metar')
+            if metar and 'icao' in metar:
+                extend(('', f"{conf.metar_source} METAR:"))
                 # Split metar if needed
-                metar = f"{wdata['metar']['icao']} {wdata['metar']['metar']}"
-                sysinfo += util.format_text(metar, chars, 3)
+                line = f"{metar['icao']} {metar['metar']}"
+                extend(util.format_text(line, chars, 3))
 
-                if self.conf.metar_decode:
+                if conf.metar_decode:
                     # METAR Decoding Section
-                    sysinfo += [
-                        f"   Apt altitude: {int(c.m2ft(wdata['metar']['elevation']))}ft, "
-                        f"Apt distance: {round(wdata['metar']['distance'] / 1000, 1)}km",
-                        f"   Temp: {round(wdata['metar']['temperature'][0])}, "
-                        f"Dewpoint: {round(wdata['metar']['temperature'][1])}, "
-                        f"Visibility: {round(wdata['metar']['visibility'])}m, "
-                        f"Press: {wdata['metar']['pressure']:.2f} inhg ({c.inHg2mb(wdata['metar']['pressure']):.1f} mb)"
-                    ]
-
-                    wind = f"   Wind:  {wdata['metar']['wind'][0]} {wdata['metar']['wind'][1]}kt"
-                    if wdata['metar']['wind'][2]:
-                        wind += f", gust {wdata['metar']['wind'][2]}kt"
-                    if 'variable_wind' in wdata['metar'] and wdata['metar']['variable_wind']:
-                        wind += f" Variable: {wdata['metar']['variable_wind'][0]}-{wdata['metar']['variable_wind'][1]}"
-                    sysinfo += [wind]
-
-                    if 'precipitation' in wdata['metar'] and len(wdata['metar']['precipitation']):
-                        precip = ''
-                        for type in wdata['metar']['precipitation']:
-                            if wdata['metar']['precipitation'][type]['recent']:
-                                precip += wdata['metar']['precipitation'][type]['recent']
-                            precip += f"{wdata['metar']['precipitation'][type]['int']}{type} "
-                        sysinfo += [f"   Precipitation: {precip}"]
-
-                    if 'clouds' in wdata['metar']:
-                        if len(wdata['metar']['clouds']):
-                            clouds = '   Clouds: BASE|COVER    '
-                            for cloud in wdata['metar']['clouds']:
-                                alt, coverage, type = cloud
-                                clouds += f"{c.m2fl(alt):03}|{coverage}{type} "
+                    temp, dewp = metar['temperature'][:2]
+                    pressure = metar['pressure']
+                    extend((
+                        f"   Apt altitude: {int(m2ft(metar['elevation']))}ft, "
+                        f"Apt distance: {round(metar['distance'] / 1000, 1)}km",
+                        f"   Temp: {round(temp)}, "
+                        f"Dewpoint: {round(dewp)}, "
+                        f"Visibility: {round(metar['visibility'])}m, "
+                        f"Press: {pressure:.2f} inhg ({c.inHg2mb(pressure):.1f} mb)"
+                    ))
+
+                    wdir, wspeed, gust = metar['wind'][:3]
+                    gust = f", gust {gust}kt" if gust else ''
+                    variable_wind = metar.get('variable_wind')
+                    variable = f" Variable: {variable_wind[0]}-{variable_wind[1]}" if variable_wind else ''
+                    append(f"   Wind:  {wdir} {wspeed}kt{gust}{variable}")
+
+                    precipitation = metar.get('precipitation')
+                    if precipitation:
+                        precip = ''.join(
+                            f"{value['recent'] or ''}{value['int']}{type_} " for type_, value in precipitation.items())
+                        append(f"   Precipitation: {precip}")
+
+                    metar_clouds = metar.get('clouds')
+                    if metar_clouds is not None:
+                        if len(metar_clouds):
+                            clouds = '   Clouds: BASE|COVER    ' + ''.join(
+                                f"{m2fl(alt):03}|{coverage}{type_} " for alt, coverage, type_ in metar_clouds)
                         else:
                             clouds = '   Clouds and Visibility OK'
-                        sysinfo += [clouds]
+                        append(clouds)
 
-                if 'rwmetar' in wdata and self.conf.use_real_weather_data:
-                    if not wdata['rwmetar'].get('file_time'):
-                        sysinfo += ['XP12 REAL WEATHER METAR:', '   no METAR file, still downloading...']
+                rwmetar = wdata.get('rwmetar')
+                if rwmetar is not None and use_rw:
+                    if not rwmetar.get('file_time'):
+                        extend(('XP12 REAL WEATHER METAR:', '   no METAR file, still downloading...'))
                     else:
-                        sysinfo += [f"XP12 REAL WEATHER METAR ({wdata['rwmetar']['file_time']}):"]
-                        line = f"{wdata['rwmetar']['result'][0]} {wdata['rwmetar']['result'][1]}"
-                        sysinfo += util.format_text(line, chars, 3)
+                        append(f"XP12 REAL WEATHER METAR ({rwmetar['file_time']}):")
+                        line = f"{rwmetar['result'][0]} {rwmetar['result'][1]}"
+                        extend(util.format_text(line, chars, 3))
                     # check actual pressure and adjusted friction
-                    sysinfo += ['', 'XP12 REAL WEATHER LIVE PARAMETERS:']
-                    wind_d = round(self.data.wind_dir.value)
-                    wind_s = round(c.ms2knots(self.data.wind_spd.value))
-                    line = f"   Wind {wind_d} at {wind_s}"
-                    vis_m, vis_sm = round(c.sm2m(self.data.visibility.value)), round(self.data.visibility.value, 1)
-                    line += f" | Vis: {vis_m}m ({vis_sm}sm)"
-                    temp = round(self.data.temp.value, 1)
-                    line += f" | Temp {temp}C"
-                    pressure = self.data.pressure.value / 100  # mb
-                    pressure_inHg = c.mb2inHg(pressure)
-                    line += f" | Press. at sea lvl: {pressure:.1f}mb ({pressure_inHg:.2f}inHg)"
-                    sysinfo += [line]
-                    friction = self.data.runwayFriction.get()
-                    line = f"   Runway Friction: {friction:02}"
-                    # if friction != metar_friction:
-                    #     line += f" (original {metar_friction:02})"
-                    sysinfo += [line, '']
-
-            if not self.conf.meets_wgrib2_requirements:
+                    extend(('', 'XP12 REAL WEATHER LIVE PARAMETERS:'))
+                    wind_d = round(data.wind_dir.value)
+                    wind_s = round(c.ms2knots(data.wind_spd.value))
+                    visibility = data.visibility.value
+                    vis_m, vis_sm = round(c.sm2m(visibility)), round(visibility, 1)
+                    temp = round(data.temp.value, 1)
+                    pressure = data.pressure.value / 100  # mb
+                    append(f"   Wind {wind_d} at {wind_s} | Vis: {vis_m}m ({vis_sm}sm) | Temp {temp}C"
+                           f" | Press. at sea lvl: {pressure:.1f}mb ({c.mb2inHg(pressure):.2f}inHg)")
+                    friction = data.runwayFriction.get()
+                    # if friction != metar_friction: add f" (original {metar_friction:02})"
+                    extend((f"   Runway Friction: {friction:02}", ''))
+
+            if not conf.meets_wgrib2_requirements:
                 '''not a compatible OS with wgrib2'''
-                sysinfo += ['',
-                            '*** *** WGRIB2 decoder not available for your OS version *** ***',
-                            'Windows 7 or above, MacOS 10.14 or above, Linux kernel 4.0 or above.',
-                            ''
-                            ]
+                extend(('',
+                        '*** *** WGRIB2 decoder not available for your OS version *** ***',
+                        'Windows 7 or above, MacOS 10.14 or above, Linux kernel 4.0 or above.',
+                        ''
+                        ))
             elif 'gfs' not in wdata:
-                sysinfo += ['',
-                            '*** An error has occurred ***',
-                            'No GFS data is available, check log',
-                            ''
-                            ]
+                extend(('',
+                        '*** An error has occurred ***',
+                        'No GFS data is available, check log',
+                        ''
+                        ))
             else:
-                if not wdata['gfs']:
+                gfs = wdata['gfs']
+                if not gfs:
                     pass
                 else:
                     # GFS data download for testing is enabled
-                    sysinfo += [
-                        '*** *** GFS 0.25 degrees weather data download *** ***'
-                    ]
-                    gfs = wdata['gfs']
-                    if 'surface' in gfs and len(gfs['surface']):
-                        s = gfs['surface']
-                        surface_temp = round(c.kel2cel(s.get('temp')), 1)
+                    append('*** *** GFS 0.25 degrees weather data download *** ***')
+                    s = gfs.get('surface')
+                    if s:
+                        surface_temp = round(kel2cel(s.get('temp')), 1)
                         snow = s.get('snow')
                         d = 0
                         if c.is_exponential(snow):
-                            if self.nearest_snow:
-                                nlat, nlon, snow = self.nearest_snow.values()
+                            if self.nearest_snow is not None:
+                                nlat, nlon, snow = self.nearest_snow
                                 d = round(c.m2nm(c.greatCircleDistance((lat, lon), (nlat, nlon))), 1)  # in nm
                             else:
                                 snow = None
                         snow_depth = f"{'na' if snow is None or snow < 0 else round(snow, 2)}{'' if not d else f' ({d} nm)'}"
-                        acc_precip = 'na' if (s.get('acc_precip') is None or s.get('acc_precip') < 0) else round(s.get('acc_precip'), 2)
-                        sysinfo += [
+                        acc_precip = s.get('acc_precip')
+                        acc_precip = 'na' if (acc_precip is None or acc_precip < 0) else round(acc_precip, 2)
+                        extend((
                             f"   sfc temp (C): {surface_temp} | snow depth (m): {snow_depth} | accumulated precip. (kg/sqm): {acc_precip}",
                             ''
-                        ]
+                        ))
                     else:
                         # probably there was an error downloading data from NOAA server
-                        sysinfo += [
-                            'No precipitation data available. Check log files'
-                        ]
+                        append('No precipitation data available. Check log files')
 
-                if 'rw' in wdata and self.conf.use_real_weather_data:
+                if 'rw' in wdata and use_rw:
                     # XP12 Real Weather is enabled
                     rw = wdata['rw']
                     if 'winds' in rw:
-                        sysinfo += ['XP12 REAL WEATHER WIND LAYERS: FL | HDG KT | TEMP | DEV']
-                        wlayers = ''
-                        out = []
-                        for i, layer in enumerate(rw['winds'], 1):
-                            alt, hdg, speed, extra = layer
-                            wind = f"{hdg:03.0f} {speed:>3.0f}kt"
-                            temp = round(c.kel2cel(extra['temp']))
-                            dev = round(c.kel2cel(extra['dev']))
-                            wlayers += f"    F{c.m2fl(alt):03} | {wind} | {temp:> 3} | {dev:> 3}"
-                            if i % 3 == 0 or i == len(rw['winds']):
-                                out.append(wlayers)
-                                wlayers = ''
-                        sysinfo += out
+                        append('XP12 REAL WEATHER WIND LAYERS: FL | HDG KT | TEMP | DEV')
+                        winds = rw['winds']
+                        # convert whole columns, then format the rows
+                        fls = c.m2fl_column(winds['alt'])
+                        temps = c.kel2cel_column(winds['temp'])
+                        devs = c.kel2cel_column(winds['dev'])
+                        wlayers = [
+                            f"    F{fl:03} | {hdg:03.0f} {speed:>3.0f}kt | {temp:> 3} | {dev:> 3}"
+                            for fl, hdg, speed, temp, dev in zip(fls, winds['hdg'], winds['speed'], temps, devs)
+                        ]
+                        extend(util.join_groups(wlayers, 3))
 
                     if 'tropo' in rw and rw['tropo'].values():
                         alt, temp, dev = rw['tropo'].values()
                         if alt and temp and dev:
-                            sysinfo += [f"TROPO LIMIT: {round(alt)}m (F{c.m2fl(alt):03}) | "
-                                        f"temp {round(c.kel2cel(temp))}C ISA Dev {round(c.kel2cel(dev))}C"]
+                            append(f"TROPO LIMIT: {round(alt)}m (F{m2fl(alt):03}) | "
+                                   f"temp {round(kel2cel(temp))}C ISA Dev {round(kel2cel(dev))}C")
 
                     if 'clouds' in rw:
-                        sysinfo += ['XP12 REAL WEATHER CLOUD LAYERS  FLBASE | FLTOP | COVER']
-                        clayers = ''
-                        clouds = [el for el in rw['clouds'] if el[0] > 0]
-                        out = []
-                        if not len(clouds):
-                            sysinfo += ['    None reported']
+                        append('XP12 REAL WEATHER CLOUD LAYERS  FLBASE | FLTOP | COVER')
+                        clouds = rw['clouds']
+                        clayers = [
+                            f"    {m2fl(base):03} | {m2fl(top):03} | {cover:.0f}%"
+                            for base, top, cover in zip(clouds['base'], clouds['top'], clouds['cover']) if base > 0
+                        ]
+                        if not clayers:
+                            append('    None reported')
                         else:
-                            for i, layer in enumerate(clouds, 1):
-                                base, top, cover = layer
-                                clayers += f"    {c.m2fl(base):03} | {c.m2fl(top):03} | {cover:.0f}%"
-                                if i % 3 == 0 or i == len(clouds):
-                                    out.append(clayers)
-                                    clayers = ''
-                            sysinfo += out
+                            extend(util.join_groups(clayers, 3))
 
+                    max_turbulence = conf.max_turbulence
+                    turbulence_columns = self.turbulence_columns(max_turbulence)
                     if 'turbulence' in rw:
                         wafs = rw['turbulence']
-                        tblayers = ''
-                        out = []
-                        cycle = 'not ready yet' if 'None' in wdata['info']['rw_wafs_cycle'] else wdata['info']['rw_wafs_cycle']
-                        sysinfo += [f"XP12 REAL WEATHER TURBULENCE ({wdata['info']['rw_wafs_cycle']}):  "
-                                    f"FL | SEV (val*10, max {self.conf.max_turbulence * 10}) "]
-                        for i, layer in enumerate(wafs, 1):
-                            fl = c.m2fl(layer[0])
-                            value = f"{round(layer[1] * 10, 1):.1f}" if layer[1] < self.conf.max_turbulence else '*'
-                            tblayers += f"    F{fl:03} | {value:3}"
-                            if i % 7 == 0 or i == len(wafs):
-                                out.append(tblayers)
-                                tblayers = ''
-                        sysinfo += out
-                    if self.conf.download_WAFS and 'wafs' in wdata and 'turbulence' in wdata['wafs']:
-                        wafs = wdata['wafs']['turbulence']
-                        tblayers = ''
-                        out = []
-                        sysinfo += [f"NOAA Downloaded WAFS data ({wdata['info']['wafs_cycle']}):  "
-                                    f"FL | SEV (val*10, max {self.conf.max_turbulence * 10}) "]
-                        for i, layer in enumerate(wafs, 1):
-                            fl = c.m2fl(layer[0])
-                            value = f"{round(layer[1] * 10, 1):.1f}" if layer[1] < self.conf.max_turbulence else '*'
-                            tblayers += f"    F{fl:03} | {value:3}"
-                            if i % 7 == 0 or i == len(wafs):
-                                out.append(tblayers)
-                                tblayers = ''
-                        sysinfo += out
-                    sysinfo += ['']
+                        append(f"XP12 REAL WEATHER TURBULENCE ({info['rw_wafs_cycle']}):  {turbulence_columns}")
+                        extend(util.join_groups(self.turbulence_layers(wafs, max_turbulence), 7))
+                    wafs = wdata.get('wafs')
+                    if conf.download_WAFS and wafs and 'turbulence' in wafs:
+                        wafs = wafs['turbulence']
+                        append(f"NOAA Downloaded WAFS data ({info['wafs_cycle']}):  {turbulence_columns}")
+                        extend(util.join_groups(self.turbulence_layers(wafs, max_turbulence), 7))
+                    append('')
 
                 else:
                     '''Normal GFS mode'''
@@ -511,10 +581,27 @@ class Weather:
 
         return sysinfo
 
+    @staticmethod
+    @lru_cache(maxsize=2)
+    def turbulence_columns(max_turbulence: float) -> str:
+        """Turbulence layers header, it only changes with the conf"""
+        return f"FL | SEV (val*10, max {max_turbulence * 10}) "
+
+    @staticmethod
+    def turbulence_layers(wafs: dict, max_turbulence: float) -> list[str]:
+        """Formats turbulence columns, severities over max_turbulence are marked with *"""
+        values = (f"{round(sev * 10, 1):.1f}" if sev < max_turbulence else '*' for sev in wafs['value'])
+        return [f"    F{fl:03} | {value:3}" for fl, value in zip(c.m2fl_column(wafs['alt']), values)]
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def platform_info() -> tuple[str, str]:
+        """Returns platform and python version, they don't change while running"""
+        return platform.platform(), platform.python_version()
+
     def dumpLog(self) -> Path:
-        """Dumps all the information to a file to report bugs"""
-        import platform
-        from pprint import pprint
+        """Dumps all the information to a file to report bugs
+            SDK values are collected here, formatting and file I/O run in a background thread"""
 
         dumpath = Path(self.conf.cachepath, 'dumplogs')
         dumpath.mkdir(parents=True, exist_ok=True)
@@ -522,41 +609,28 @@ class Weather:
         dumplog = Path(dumpath, datetime.utcnow().strftime('%Y%m%d_%H%M%SZdump.txt'))
         xp.log(f"creating dumplog file: {dumplog}")
 
-        f = open(dumplog, 'w')
-
         xpver, sdkver, hid = xp.getVersions()
+        platform_name, python_version = self.platform_info()
         output = [
             '--- Platform Info ---\n',
             f"Plugin version: {self.conf.__VERSION__}\n",
             f"Xplane Version: {round(xpver/1000, 3)}, SDK Version: {round(sdkver/100, 2)}\n",
-            f"Platform: {platform.platform()}\n",
-            f"Python version: {platform.python_version()}\n",
+            f"Platform: {platform_name}\n",
+            f"Python version: {python_version}\n",
             '\n--- Weather Status ---\n'
         ]
 
         for line in self.weatherInfo():
             output.append(f"{line}\n")
 
-        output += ['\n--- Weather Data ---\n']
-
-        for line in output:
-            f.write(line)
-
-        pprint(self.weatherData, f, width=160)
-        f.write('\n--- Transition data Data --- \n')
-        pprint(c.transrefs, f, width=160)
-
-        f.write('\n--- Weather Datarefs --- \n')
-
-        # dump datarefs
-        pprint(self.data.dump(), f, width=160)
-
-        f.write('\n--- Configuration ---\n')
-        vars = {}
-        for var in self.conf.__dict__:
-            if type(self.conf.__dict__[var]) in (str, int, float, list, tuple, dict):
-                vars[var] = self.conf.__dict__[var]
-        pprint(vars, f, width=160)
+        # weatherData is replaced, never updated in place, by the client thread
+        vars = {k: v for k, v in self.conf.__dict__.items() if isinstance(v, (str, int, float, list, tuple, dict))}
+        sections = [
+            ('\n--- Weather Data ---\n', self.weatherData),
+            ('\n--- Transition data Data --- \n', dict(c.transrefs)),
+            ('\n--- Weather Datarefs --- \n', self.data.dump()),
+            ('\n--- Configuration ---\n', vars),
+        ]
 
         # Append tail of PythonInterface log files
         logfiles = [
@@ -565,22 +639,40 @@ class Weather:
             Path('noaaweather', 'weatherServerLog.txt'),
         ]
 
-        for logfile in logfiles:
-            try:
-                filepath = Path(xp.PLUGINSPATH, logfile)
-            except ImportError:
-                filepath = Path(self.conf.syspath, 'Resources', 'plugins', 'PythonScripts', logfile)
-            if filepath.is_file():
-
-                lfsize = filepath.stat().st_size
-                lf = open(filepath, 'r')
-                lf.seek(0, os.SEEK_END)
-                lf.seek(lf.tell() - c.limit(1024 * 6, lfsize), os.SEEK_SET)
-                f.write(f"\n--- {logfile} ---\n\n")
-                for line in lf.readlines():
-                    f.write(line.strip('\r'))
-                lf.close()
+        try:
+            logpath = Path(xp.PLUGINSPATH)
+        except (ImportError, AttributeError):
+            logpath = Path(self.conf.syspath, 'Resources', 'plugins', 'PythonScripts')
 
-        f.close()
+        threading.Thread(
+            target=self.write_dump, args=(dumplog, output, sections, [(f, logpath / f) for f in logfiles]), daemon=True
+        ).start()
 
         return dumplog
+
+    @staticmethod
+    def write_dump(dumplog: Path, output: list, sections: list, logfiles: list):
+        """Writes a dumplog file: status lines, data sections and the tail of (name, path) log files"""
+        from pprint import pprint
+
+        with open(dumplog, 'w') as f:
+            f.writelines(output)
+
+            for title, data in sections:
+                f.write(title)
+                try:
+                    # built in one go, a failure must not leave a partial section
+                    f.write(f"{json.dumps(data, indent=2, default=repr)}\n")
+                except (TypeError, ValueError):
+                    # non string keys
+                    pprint(data, f, width=160)
+
+            for logfile, filepath in logfiles:
+                if filepath.is_file():
+                    with filepath.open('rb') as lf:
+                        # seek to the last 6KB and read them in one go
+                        size = lf.seek(0, os.SEEK_END)
+                        lf.seek(max(0, size - 1024 * 6))
+                        tail = lf.read().replace(b'\r', b'')
+                    # the seek could land in the middle of a multibyte char
+                    f.write(f"\n--- {logfile} ---\n\n{tail.decode('utf-8', errors='replace')}")
@@ -13,13 +13,13 @@ as published by the Free Software Foundation; either version 2
 of the License, or any later version.
 """
 
+import itertools
 import os
 import sys
 import signal
 import socket
 import time
 import threading
-import pickle as cPickle
 import socketserver as SocketServer
 
 from pathlib import Path
@@ -39,32 +39,61 @@ from .realweather import RealWeather
 from .gfs import GFS
 from .wafs import WAFS
 from .weathersource import Worker
+from .sharedbuffer import SharedBuffer
+from .protocol import Protocol
+
+# static responses, encoded once
+NOT_AVAILABLE = {'icao': 'METAR STATION', 'metar': 'NOT AVAILABLE'}
+NOT_AVAILABLE_RESPONSE = Protocol.encode({'metar': NOT_AVAILABLE, 'rwmetar': NOT_AVAILABLE})
+PONG = Protocol.control('!pong')
+SHM_NOTIFY = Protocol.control('!shm')
+
+# encoded weather responses by request position: (expiry, response)
+WEATHER_CACHE_TTL = 5
+weather_cache = {}
+
+# serialises weather data requests against the !reload and !reset* commands, which rewrite conf and databases
+# METAR queries and pings don't take it
+weather_lock = threading.Lock()
+# weather requests arrival order, a response older than the last one written is dropped
+request_seq = itertools.count(1)
 
 
 class LogFile:
-    """File object wrapper, adds timestamp to print output"""
+    """File object wrapper, adds a timestamp to each line of print output"""
 
     def __init__(self, file: Path, options):
         self.f = open(file, options)
+        self.line_start = True
 
-    def write(self, data):
-        if len(data) > 1:
-            self.f.write(f"{datetime.now().strftime('%b %d %H:%M:%S')}  {data}")
-        else:
-            self.f.write(data)
+    def write(self, data: str) -> int:
+        if self.line_start and not data.isspace():
+            self.f.write(f"{datetime.now().strftime('%b %d %H:%M:%S')}  ")
+            self.line_start = False
+        if data:
+            self.line_start = data.endswith('\n') or (self.line_start and data.isspace())
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
 
-    def __getattr__(self, name):
-        return getattr(self.f, name)
+    def fileno(self) -> int:
+        return self.f.fileno()
 
-    def __setattr__(self, name, value):
-        if name != 'f':
-            setattr(self.f, name, value)
-        else:
-            self.__dict__[name] = value
+    def close(self):
+        self.f.close()
+
+
+class ThreadingUDPServer(SocketServer.ThreadingMixIn, SocketServer.UDPServer):
+    """Handles each request in its own thread, a METAR query doesn't wait for wgrib2 parsing"""
+    daemon_threads = True
 
 
 class ClientHandler(SocketServer.BaseRequestHandler):
 
+    # sequence of the last weather response written in the shared buffer
+    written_seq = 0
+
     @staticmethod
     def get_weather_data(data) -> dict | bool:
         """Collects weather data for the response"""
@@ -122,16 +151,32 @@ class ClientHandler(SocketServer.BaseRequestHandler):
             response['rwmetar'] = dict(zip(('file_time', 'result'), [rw.metar_file_time, rw.get_rwmetar(apt[0])]))
         return response
 
-    def shutdown(self):
-        # shutdown Needs to be from called from a different thread
-        def shut_down_now(srv):
-            srv.shutdown()
+    def cached_weather_data(self, data) -> bytes | bool:
+        """Returns the encoded weather data, reusing a recent response for the same position and heading"""
+        # client rounds the position, ground speed is not used
+        key = tuple(data[:3])
+        now = time.monotonic()
+        cached = weather_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        with weather_lock:
+            response = self.get_weather_data(data)
+        if response:
+            response = Protocol.encode(response)
+            if len(weather_cache) > 32:
+                weather_cache.clear()
+            weather_cache[key] = now + WEATHER_CACHE_TTL, response
+        return response
 
-        th = threading.Thread(target=shut_down_now, args=(self.server,))
-        th.start()
+    @staticmethod
+    def shutdown():
+        # the server is shut down by the shutdown thread, it can't wait for itself from a handler
+        shutdown_request.set()
 
     def handle(self):
         response = False
+        weather_data = False
         data = self.request[0].decode('utf-8').strip("\n\r\t")
 
         if len(data) > 1:
@@ -139,49 +184,54 @@ class ClientHandler(SocketServer.BaseRequestHandler):
                 # weather data request
                 sdata = data[1:].split('|')
                 if len(sdata) > 1:
-                    response = self.get_weather_data(sdata)
+                    weather_data = next(request_seq)
+                    response = self.cached_weather_data(sdata)
                 elif len(data) == 5:
                     # Icao
-                    response = {}
                     apt = metar.get_metar(data[1:])
-                    if apt and len(apt) > 2 and apt[5]:
-                        # response['metar'] = metar.parse_metar(apt[0], apt[5], apt[3])
-                        response['metar'] = dict(zip(('icao', 'metar'), [apt[0], apt[5]]))
+                    rwapt = rw.get_rwmetar(data[1:])
+                    found = apt and len(apt) > 2 and apt[5]
+                    rwfound = rwapt and rwapt[1]
+                    if not (found or rwfound):
+                        response = NOT_AVAILABLE_RESPONSE
                     else:
-                        response['metar'] = {
-                            'icao': 'METAR STATION',
-                            'metar': 'NOT AVAILABLE'
-                        }
-                    apt = rw.get_rwmetar(data[1:])
-                    # print(f" ** weatherServer | RWMETAR: {apt}")
-                    if apt and apt[1]:
-                        response['rwmetar'] = dict(zip(('icao', 'metar'), [apt[0], apt[1]]))
-                        # response['rwmetar'] = dict(zip(('icao', 'metar'), rw.get_real_weather_metar(data[1:])))
-                        # print(f"METAR TEST: {xp.getMETARForAirport(data[1:])}")
-                        # xp.log(f"METAR TEST: {xp.getMETARForAirport(data[1:])}")
-                    else:
-                        response['rwmetar'] = {
-                            'icao': 'METAR STATION',
-                            'metar': 'NOT AVAILABLE'
+                        # response['metar'] = metar.parse_metar(apt[0], apt[5], apt[3])
+                        response = {
+                            'metar': {'icao': apt[0], 'metar': apt[5]} if found else NOT_AVAILABLE,
+                            'rwmetar': {'icao': rwapt[0], 'metar': rwapt[1]} if rwfound else NOT_AVAILABLE,
                         }
             elif data == '!shutdown':
                 conf.serverSave()
                 self.shutdown()
                 response = '!bye'
             elif data == '!reload':
-                conf.serverSave()
-                conf.pluginLoad()
+                with weather_lock:
+                    conf.serverSave()
+                    conf.pluginLoad()
+                    weather_cache.clear()
+                    # METAR update rates may have changed
+                    metar.next_run = 0
+                worker.wake()
             elif data == '!resetMetar':
                 # Clear database and force redownload
-                metar.clear_reports(conf.dbfile)
-                metar.last_timestamp = 0
-                metar.next_metarRWX = time.time() + 10
+                with weather_lock:
+                    weather_cache.clear()
+                    metar.clear_reports(conf.dbfile)
+                    metar.last_timestamp = 0
+                    metar.next_metarRWX = time.time() + 10
+                    metar.next_run = 0
+                worker.wake()
             elif data == '!resetRWMetar':
                 # reload database
-                rw.next_rwmetar = time.time() + 5
-                metar.next_metarRWX = time.time() + 5
+                with weather_lock:
+                    weather_cache.clear()
+                    rw.next_rwmetar = time.time() + 5
+                    metar.next_metarRWX = time.time() + 5
+                    rw.next_run = rw.next_rwmetar
+                    metar.next_run = metar.next_metarRWX
+                worker.wake()
             elif data == '!ping':
-                response = '!pong'
+                response = PONG
             else:
                 return
 
@@ -189,11 +239,31 @@ class ClientHandler(SocketServer.BaseRequestHandler):
         nbytes = 0
 
         if response:
-            response = cPickle.dumps(response)
-            socket.sendto(response + b"\n", self.client_address)
-            nbytes = sys.getsizeof(response)
-
-        print(f"{self.client_address[0]}:{data}: {nbytes} bytes sent.")
+            if isinstance(response, str):
+                response = Protocol.control(response)
+            elif isinstance(response, dict):
+                response = Protocol.encode(response)
+            if weather_data:
+                with shm_lock:
+                    if weather_data < ClientHandler.written_seq:
+                        # a newer request was answered while this one was parsing
+                        if conf.verbose:
+                            print(f"{self.client_address[0]}:{data}: stale response dropped.")
+                        return
+                    ClientHandler.written_seq = weather_data
+                    if shm.write(response):
+                        # weather data goes through the shared buffer, just notify the client
+                        # while holding the lock, so notifications follow the writes order
+                        nbytes = len(response)
+                        socket.sendto(SHM_NOTIFY, self.client_address)
+                        response = None
+            if response:
+                nbytes = len(response)
+                socket.sendto(response, self.client_address)
+
+        if conf.verbose or not weather_data:
+            # weather requests come every few seconds, log them only in verbose mode
+            print(f"{self.client_address[0]}:{data}: {nbytes} bytes sent.")
 
 
 if __name__ == "__main__":
@@ -220,16 +290,26 @@ if __name__ == "__main__":
     print(sys.argv)
 
     try:
-        server = SocketServer.UDPServer(("localhost", conf.server_port), ClientHandler)
+        server = ThreadingUDPServer((conf.server_address, conf.server_port), ClientHandler)
     except socket.error:
-        print(f"Can't bind address: {'localhost'}, port: {conf.server_port}.")
+        print(f"Can't bind address: {conf.server_address}, port: {conf.server_port}.")
 
         if conf.weatherServerPid is not False:
             print(f"Killing old server with pid {conf.weatherServerPid}")
             os.kill(conf.weatherServerPid, signal.SIGTERM)
             time.sleep(2)
             conf.serverLoad()
-            server = SocketServer.UDPServer(("localhost", conf.server_port), ClientHandler)
+            server = ThreadingUDPServer((conf.server_address, conf.server_port), ClientHandler)
+
+    server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+
+    # Stops the server on a !shutdown request
+    shutdown_request = threading.Event()
+    threading.Thread(target=lambda: shutdown_request.wait() and server.shutdown(), daemon=True).start()
+
+    # Weather data shared buffer
+    shm = SharedBuffer(conf.shmfile, conf.shm_size, create=True)
+    shm_lock = threading.Lock()
 
     # Save pid
     conf.weatherServerPid = os.getpid()
@@ -266,6 +346,7 @@ if __name__ == "__main__":
     # Close gfs worker and save config
     worker.shutdown()
     conf.serverSave()
+    shm.close()
     sys.stdout.flush()
 
     print('Server stopped.')
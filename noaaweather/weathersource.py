@@ -15,10 +15,14 @@ import ssl
 import zlib
 import subprocess
 import sys
+import time
 
+from bisect import bisect_right
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
 from urllib.request import Request, urlopen
 from urllib.error import URLError
-from datetime import datetime, timedelta
 from tempfile import TemporaryFile
 from pathlib import Path
 
@@ -29,6 +33,8 @@ class WeatherSource(object):
     """Weather source metaclass"""
 
     cache_path = False
+    # epoch time before which the worker skips this source, set by run to the next time it has work to do
+    next_run = 0
 
     def __init__(self, conf):
         self.download = False
@@ -53,14 +59,16 @@ class WeatherSource(object):
 
         kwargs = {'stdout': subprocess.PIPE, "text": True}
         if self.conf.spinfo:
-            kwargs.update({'startupinfo': self.conf.spinfo, 'shell': True})
-
-        proc = subprocess.Popen([self.conf.wgrib2bin] + args, **kwargs)
+            # startupinfo already hides the window, no need to spawn a shell too
+            kwargs.update({'startupinfo': self.conf.spinfo})
 
-        if not proc.stdout:
-            return [] 
+        try:
+            proc = subprocess.run([self.conf.wgrib2bin] + args, **kwargs)
+        except OSError as e:
+            print(f"Can't run wgrib2 on {file.name}: {e}")
+            return []
 
-        return proc.stdout.read().splitlines()
+        return proc.stdout.splitlines() if proc.stdout else []
 
     def shutdown(self):
         """Stop pending processes"""
@@ -75,10 +83,15 @@ class GribWeatherSource(WeatherSource):
     """Grib file weather source"""
 
     cycles = range(0, 24, 6)
-    publish_delay = {'hours': 4, 'minutes': 25}
+    # cycles are published with 4 hours 25min delay, in seconds
+    publish_delay = 4 * 3600 + 25 * 60
     variable_list = []
-    download_wait = 0
+    # seconds to wait before retrying a failed download
+    retry_wait = 60
     grib_conf_var = 'lastgrib'
+    # repack downloaded files with simple packing: every weather request reads them again with wgrib2,
+    # decoding complex/jpeg packing once is cheaper than on every read
+    simple_packing = True
 
     levels = [
         '1000',  # ~ surface
@@ -104,28 +117,39 @@ class GribWeatherSource(WeatherSource):
         if self.last_grib and not Path(self.cache_path, self.last_grib).is_file():
             self.last_grib = False
 
+    @classmethod
+    def last_cycle(cls) -> tuple[time.struct_time, int, int]:
+        """Returns the UTC date and hour of the last cycle available and the hours elapsed since the cycle"""
+        now = int(time.time())
+        cnow = now - cls.publish_delay
+        cycle = cls.cycles[bisect_right(cls.cycles, cnow // 3600 % 24) - 1]
+        elapsed = now // 3600 % 24 - cycle
+        if cnow // 86400 != now // 86400:
+            elapsed += 24
+        return time.gmtime(cnow), cycle, elapsed
+
+    @classmethod
+    def next_cycle_change(cls) -> float:
+        """Returns the epoch time the cache file name can change next: at the hour for the forecast,
+        at the publish delay past the hour for the cycle"""
+        now = time.time()
+        return now + min(3600 - now % 3600, 3600 - (now - cls.publish_delay) % 3600)
+
     @classmethod
     def get_cycle_date(cls) -> tuple[str, int, int]:
         """Returns last cycle date available"""
-
-        now = datetime.utcnow()
-        # cycle is published with 4 hours 25min delay
-        cnow = now - timedelta(**cls.publish_delay)
-        # get last cycle
-        for cycle in cls.cycles:
-            if cnow.hour >= cycle:
-                lcycle = cycle
+        cdate, cycle, elapsed = cls.last_cycle()
         # Forecast
-        adjs = 0
-        if cnow.day != now.day:
-            adjs = +24
-        forecast = (adjs + now.hour - lcycle) // 3 * 3
+        forecast = elapsed // 3 * 3
 
-        return f"{cnow.year}{cnow.month:02}{cnow.day:02}", lcycle, forecast
+        return time.strftime('%Y%m%d', cdate), cycle, forecast
 
     def run(self, elapsed: int):
         """Worker function called by a worker thread to update the data"""
 
+        # nothing to download until a new cycle or forecast is published
+        self.next_run = self.next_cycle_change()
+
         if not self.download_enabled:
             # data download is disabled
             return
@@ -133,10 +157,6 @@ class GribWeatherSource(WeatherSource):
         if not self.conf.meets_wgrib2_requirements:
             return
 
-        if self.download_wait:
-            self.download_wait -= elapsed
-            return
-
         datecycle, cycle, forecast = self.get_cycle_date()
         cache_file = self.get_cache_filename(datecycle, cycle, forecast)
         cache_file_path = Path(self.cache_path, cache_file)
@@ -156,10 +176,11 @@ class GribWeatherSource(WeatherSource):
                 binary=True,
                 variable_list=self.variable_list,
                 cancel_event=self.die,
-                decompress=self.conf.wgrib2bin,
+                decompress=self.conf.wgrib2bin if self.simple_packing else False,
                 spinfo=self.conf.spinfo
             )
             self.download.start()
+            self.next_run = time.time() + elapsed
         else:
             if not self.download.pending():
                 self.download.join()
@@ -167,7 +188,7 @@ class GribWeatherSource(WeatherSource):
                     print(f"Error Downloading Grib file: {self.download.result}.")
                     util.remove(cache_file_path)
                     # wait a try again
-                    self.download_wait = 60
+                    self.next_run = time.time() + self.retry_wait
                 else:
                     # New file available
                     if not self.conf.keepOldFiles and self.last_grib:
@@ -179,52 +200,64 @@ class GribWeatherSource(WeatherSource):
                 self.download = False
             else:
                 # Waiting for download
-                return
+                self.next_run = time.time() + elapsed
 
-    def __getattr__(self, item):
-        if item == 'last_grib':
-            return getattr(self.conf, self.grib_conf_var)
-        return self.__getattribute__(item)
+    @property
+    def last_grib(self):
+        """Last downloaded GRIB file name, stored in conf"""
+        return getattr(self.conf, self.grib_conf_var)
 
-    def __setattr__(self, key, value):
-        if key == 'last_grib':
-            self.conf.__dict__[self.grib_conf_var] = value
-        self.__dict__[key] = value
+    @last_grib.setter
+    def last_grib(self, value):
+        self.conf.__dict__[self.grib_conf_var] = value
 
 
 class Worker(threading.Thread):
-    """Creates a new thread to periodically run worker functions on weather sources to trigger
-    data updating or other tasks
+    """Creates a new thread to run worker functions on weather sources to trigger
+    data updating or other tasks, each source is run when its next_run is due
 
     Attributes:
         workers (list): Worker functions to be called
         die (threading.Event): Se the flag to end the thread
-        rate (int): wait rate seconds between runs
+        wakeup (threading.Event): Set by wake to reschedule after a next_run changed from another thread
+        rate (int): poll interval for sources waiting on a download, or that don't set their next_run
     """
 
     def __init__(self, workers, rate):
         self.workers = workers
         self.die = threading.Event()
+        self.wakeup = threading.Event()
         self.rate = rate
         threading.Thread.__init__(self)
 
     def run(self):
-        while not self.die.wait(self.rate):
+        while not self.die.is_set():
+            # sleep until the first source is due
+            self.wakeup.wait(max(0, min(worker.next_run for worker in self.workers) - time.time()))
+            self.wakeup.clear()
+            now = time.time()
             for worker in self.workers:
-                worker.run(self.rate)
+                if worker.next_run <= now and not self.die.is_set():
+                    worker.run(self.rate)
+                    if worker.next_run <= now:
+                        worker.next_run = now + self.rate
 
-        if self.die.is_set():
-            for worker in self.workers:
-                worker.shutdown()
+        for worker in self.workers:
+            worker.shutdown()
+
+    def wake(self):
+        """Reschedules the sources, call after changing a next_run"""
+        self.wakeup.set()
 
     def shutdown(self):
         if self.is_alive():
             self.die.set()
+            self.wakeup.set()
             self.join(3)
 
 
-class AsyncTask(threading.Thread):
-    """Run an asynchronous task on a new thread
+class AsyncTask:
+    """Run an asynchronous task on the shared tasks pool, no thread is created per task
 
     Attributes:
         task (method): Worker method to be called
@@ -232,6 +265,8 @@ class AsyncTask(threading.Thread):
         result (): return of the task method
     """
 
+    pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='AsyncTask')
+
     def __init__(self, task, *args, **kwargs):
 
         self.task = task
@@ -239,9 +274,10 @@ class AsyncTask(threading.Thread):
         self.kwargs = kwargs
         self.args = args
         self.result = False
-        threading.Thread.__init__(self)
+        self.future = None
 
-        self.pending = self.is_alive
+    def start(self):
+        self.future = self.pool.submit(self.run)
 
     def run(self):
         try:
@@ -250,8 +286,15 @@ class AsyncTask(threading.Thread):
             self.result = result
         return
 
+    def pending(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def join(self, timeout: float = None):
+        if self.future is not None:
+            wait([self.future], timeout)
+
     def stop(self):
-        if self.is_alive():
+        if self.pending():
             self.cancel.set()
             self.join(3)
 
@@ -259,21 +302,33 @@ class AsyncTask(threading.Thread):
 class GribDownloader(object):
     """Grib download utilities"""
 
+    # concurrent range requests for a filtered GRIB file
+    max_connections = 4
+
     @staticmethod
-    def decompress_grib(path_in: Path, path_out: Path, wgrib2bin, spinfo=False):
-        """Unpacks grib file using wgrib2 binary
+    def decompress_grib(path_in: Path, path_out: Path, wgrib2bin, spinfo=False) -> bool:
+        """Unpacks grib file using wgrib2 binary, returns False on failure
         """
         args = [wgrib2bin, path_in, '-set_grib_type', 'simple', '-grib_out', path_out]
         kwargs = {'stdout': sys.stdout, 'stderr': sys.stderr}
 
         if spinfo:
-            kwargs.update({'shell': True, 'startupinfo': spinfo})
+            kwargs.update({'startupinfo': spinfo})
 
-        p = subprocess.Popen(args, **kwargs)
-        p.wait()
+        return subprocess.run(args, **kwargs).returncode == 0 and path_out.is_file()
 
     @staticmethod
-    def download_part(url: str, file_out, start: int = 0, end: int = 0, **kwargs):
+    @lru_cache(maxsize=None)
+    def ssl_context():
+        """Returns the SSL context shared by all downloads, None if not available"""
+        if not hasattr(ssl, '_create_unverified_context'):
+            return None
+        context = ssl._create_unverified_context()
+        context.options |= getattr(ssl, 'OP_LEGACY_SERVER_CONNECT', 4)
+        return context
+
+    @classmethod
+    def download_part(cls, url: str, file_out, start: int = 0, end: int = 0, **kwargs):
         """File Downloader supports gzip and cancel
 
         Args:
@@ -303,15 +358,8 @@ class GribDownloader(object):
         if start or end:
             req.headers['Range'] = f"bytes={start}-{end}"
 
-        if hasattr(ssl, '_create_unverified_context'):
-            context = ssl._create_unverified_context()
-            if hasattr(ssl, 'OP_LEGACY_SERVER_CONNECT'):
-                context.options |= ssl.OP_LEGACY_SERVER_CONNECT
-            else:
-                context.options |= 4
-            params = {'context': context}
-        else:
-            params = {}
+        context = cls.ssl_context()
+        params = {'context': context} if context else {}
 
         print(f"Downloading part of {url} with params: {params}")
         response = urlopen(req, **params)
@@ -322,19 +370,24 @@ class GribDownloader(object):
 
         cancel = kwargs.pop('cancel_event', False)
 
+        # read chunks in the same buffer
+        buffer = bytearray(1024 * 128)
+        view = memoryview(buffer)
+
         while True:
             if cancel and cancel.is_set():
                 raise GribDownloaderCancel("Download canceled by user.")
 
-            data = response.read(1024 * 128)
-            if not data:
+            n = response.readinto(buffer)
+            if not n:
                 # End of file
                 break
+            data = view[:n]
             if gz:
                 data = gz.decompress(data)
             try:
                 if isinstance(file_out, io.TextIOBase):
-                    file_out.write(str(data))
+                    file_out.write(str(bytes(data)))
                 else:
                     file_out.write(data)
             except Exception as e:
@@ -342,12 +395,9 @@ class GribDownloader(object):
                 raise e
 
     @staticmethod
-    def to_download(level, var, variable_list) -> bool:
-        """Returns true if level/var combination is in the download list"""
-        for group in variable_list:
-            if var in group['vars'] and level in group['levels']:
-                return True
-        return False
+    def to_download(variable_list) -> set:
+        """Returns the set of (var, level) combinations in the download list"""
+        return {(var, level) for group in variable_list for var in group['vars'] for level in group['levels']}
 
     @classmethod
     def gen_chunk_list(cls, grib_index: list, variable_list: list) -> list:
@@ -363,17 +413,15 @@ class GribDownloader(object):
 
         """
         chunk_list = []
-        end = False
+        wanted = cls.to_download(variable_list)
+        last = len(grib_index) - 1
 
-        for line in reversed(grib_index):
+        for i, line in enumerate(grib_index):
             start, var, level = line[1], line[3], line[4]
-            if cls.to_download(level, var, variable_list):
-                if end:
-                    end -= 1
+            if (var, level) in wanted:
+                # a message ends where the next one starts, the last one at the end of file
+                end = grib_index[i + 1][1] - 1 if i < last else False
                 chunk_list.append([start, end])
-            end = start
-
-        chunk_list.reverse()
 
         return chunk_list
 
@@ -394,8 +442,9 @@ class GribDownloader(object):
         """
 
         index = []
-        for line in index_file:
-            cols = line.decode('utf-8').split(':')
+        # decode once, a GFS index has over a thousand lines
+        for line in index_file.read().decode('utf-8').splitlines():
+            cols = line.split(':', 6)
             if len(cols) != 7:
                 raise RuntimeError(f"Bad GRIB file index format: Missing columns. Expected 7,  Found {len(cols)} columns: {cols}")
             try:
@@ -447,17 +496,31 @@ class GribDownloader(object):
 
         flags = 'wb' if binary else 'w'
 
+        def download_chunk(chunk: list, file_out=None):
+            try:
+                cls.download_part(str(url), file_out, start=chunk[0], end=chunk[1], **kwargs)
+            except URLError as e:
+                raise GribDownloaderError(f"Unable to open url: {url} \n\t{repr(e)}") from e
+            return file_out
+
         with open(file_path, flags) as grib_file:
             if not variable_list:
                 # Fake chunk list for non filtered files
                 chunk_list = [[False, False]]
 
-            for chunk in chunk_list:
+            if len(chunk_list) == 1:
                 print(f"downloading ...")
+                download_chunk(chunk_list[0], grib_file)
+            else:
+                # ranges are independent: download them concurrently, write them in order
+                print(f"downloading {len(chunk_list)} chunks ...")
+                pool = ThreadPoolExecutor(max_workers=cls.max_connections)
                 try:
-                    cls.download_part(str(url), grib_file, start=chunk[0], end=chunk[1], **kwargs)
-                except URLError as e:
-                    raise GribDownloaderError(f"Unable to open url: {url} \n\t{repr(e)}") from e
+                    parts = pool.map(lambda chunk: download_chunk(chunk, io.BytesIO()), chunk_list)
+                    for part in parts:
+                        grib_file.write(part.getbuffer())
+                finally:
+                    pool.shutdown(cancel_futures=True)
 
         print(f"download ended")
         wgrib2 = kwargs.pop('decompress', False)
@@ -466,8 +529,12 @@ class GribDownloader(object):
             tmp_file = Path(f"{file_path}.tmp")
             try:
                 file_path.rename(tmp_file)
-                cls.decompress_grib(tmp_file, file_path, wgrib2, spinfo)
-                util.remove(tmp_file)
+                if cls.decompress_grib(tmp_file, file_path, wgrib2, spinfo):
+                    util.remove(tmp_file)
+                else:
+                    # wgrib2 reads packed files as well, just slower
+                    print(f"Unable to decompress {file_path.name}, keeping the packed file")
+                    util.rename(tmp_file, file_path)
             except OSError as e:
                 raise GribDownloaderError(f"Unable to decompress: {file_path.name} \n\t{repr(e)}") from e
 
@@ -8,14 +8,24 @@ as published by the Free Software Foundation; either version 2
 of the License, or any later version.
 """
 
+import re
 import time
 
+from webbrowser import open_new
+
 from . import xp, Conf, c, util, dref, weather
 from .easydref import EasyCommand
 
 
 class Widget:
 
+    # ICAO codes in the METAR stations ignore list, separated by blanks or punctuation
+    RE_ICAO = re.compile(r'\b[A-Za-z0-9]{4}\b')
+    # METAR query keys: key code -> uppercase ICAO character
+    icao_keys = {ord(ch): ch.upper() for ch in '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'}
+    # METAR query editing keys: backspace, enter, esc, delete
+    metar_edit_keys = frozenset((8, 13, 27, 127))
+
     # Constants
     font_width, font_height, _ = xp.getFontDimensions(xp.Font_Basic)
     line_height = font_height + 8
@@ -25,21 +35,121 @@ class Widget:
     info_title = "X-Plane 12 NOAA GFS Weather"
     info_width = 560
     info_height = 680
-    info_lines = int((info_height - 2 * window_margin) / line_height) - 1
-    info_line_chars = int((info_width - 2 * window_margin) / font_width) - 4
+    info_lines = (info_height - 2 * window_margin) // line_height - 1
+    info_line_chars = (info_width - 2 * window_margin) // font_width - 4
+    # minimum seconds between status redraws, unless new weather data arrives
+    status_interval = 0.5
+    # minimum seconds between turbulence caption redraws while dragging the slider
+    slider_interval = 1 / 60
+    # countdown shown after Save while the server reloads the settings
+    reload_seconds = 15
 
     # METAR Window Definition
     metar_title = "METAR Request"
     metar_width = 480
     metar_height = 240
-    metar_widget_width = int(metar_width - 2 * window_margin)
-    metar_line_chars = int(metar_widget_width / font_width)
+    metar_widget_width = metar_width - 2 * window_margin
+    metar_line_chars = metar_widget_width // font_width
 
     # Config Window Definition
     config_title = "NOAA Weather Configuration"
     config_width = 640
     config_height = 480
-    config_line_chars = int((config_width - 4 * window_margin) / font_width)
+    config_line_chars = (config_width - 4 * window_margin) // font_width
+
+    # Config Window layout, x offsets from the content left edge
+    config_sub_margin = window_margin // 2
+    config_column_width = (config_width - 2 * window_margin - config_sub_margin) // 2
+    config_left = window_margin + config_sub_margin  # from the window left edge
+    config_check_x = config_column_width - line_height  # checkbox column
+    # METAR source radios: (source, caption x, caption width, button x)
+    noaa_label_width = font_width * (len("NOAA ") + 1)
+    vatsim_label_width = font_width * (len("VATSIM ") + 1)
+    metar_source_x = config_check_x - noaa_label_width * 2 - vatsim_label_width - line_height * 4
+    metar_source_radios = (
+        ('NOAA', metar_source_x, noaa_label_width, metar_source_x + noaa_label_width),
+        ('IVAO', metar_source_x + noaa_label_width + line_height * 2, noaa_label_width,
+         metar_source_x + noaa_label_width * 2 + line_height * 2),
+        ('VATSIM', metar_source_x + noaa_label_width * 2 + line_height * 4, 40, config_check_x),
+    )
+    # checkbox styles: (caption x, caption width, button x, button width)
+    config_check_styles = {
+        'check': (0, config_check_x, config_check_x, line_height),
+        'sub_check': (50, config_check_x - 50, config_check_x, line_height),
+        'small_check': (5, 15, 110, 10),
+    }
+
+    # Config window rows: (kind, lines, *args)
+    # checkbox kinds take widget attribute, caption and conf attribute, others are built by create_config_<kind>
+    config_rows = (
+        ('check', 2, 'enable_check', 'Enable Plugin:', 'enabled'),
+        ('check', 1, 'decode_check', 'METAR Decoding:', 'metar_decode'),
+        ('metar_source', 1),
+        ('check', 2, 'auto_check', 'Ignore Metars with AUTO:', 'metar_ignore_auto'),
+        ('ignore_list', 3),
+        ('check', 1, 'rwxCheck', 'Create RWX file (READ the README file!):', 'update_rwx_file'),
+        ('check', 2, 'xp12MetarCheck', 'Use Real Weather for RWX file:', 'metar_use_xp12'),
+        ('check', 1, 'GFSCheck', 'GFS data download:', 'download_GFS'),
+        ('sub_check', 1, 'snowCheck', 'Accumulated Snow:', 'set_snow'),
+        ('sub_check', 1, 'rainCheck', 'Accumulated Water:', 'set_patches'),
+    )
+    # rows added when X-Plane Real Weather data is not used
+    config_legacy_rows = (
+        ('small_check', 1, 'windsCheck', 'Wind levels', 'set_wind'),
+        ('small_check', 1, 'cloudsCheck', 'Cloud levels', 'set_clouds'),
+        ('small_check', 1, 'optUpdCheck', 'Opt. redraw', 'opt_clouds_update'),
+        ('small_check', 1, 'tempCheck', 'Temperature', 'set_temp'),
+        ('small_check', 1, 'pressureCheck', 'Pressure', 'set_pressure'),
+        ('small_check', 1, 'turbCheck', 'Turbulence', 'set_turb'),
+        ('turbulence', 2),
+        ('small_check', 1, 'tropoCheck', 'Tropo Temp', 'set_tropo'),
+        ('small_check', 1, 'thermalsCheck', 'Thermals', 'set_thermals'),
+        ('small_check', 2, 'surfaceCheck', 'Surface Wind', 'set_surface_layer'),
+        ('performance', 0),
+    )
+    # turbulence probability slider properties, position is per mille
+    turbulence_slider_properties = (
+        (xp.Property_ScrollBarType, xp.ScrollBarTypeSlider),
+        (xp.Property_ScrollBarMin, 10),
+        (xp.Property_ScrollBarMax, 1000),
+        (xp.Property_ScrollBarPageAmount, 1),
+    )
+    # turbulence caption by slider percentage
+    turbulence_labels = tuple(f"Turbulence probability {pct}%" for pct in range(101))
+    # conf attributes set by the config window besides the checkboxes
+    config_values = (
+        'turbulence_probability', 'max_cloud_height', 'max_visibility', 'ignore_metar_stations', 'metar_source'
+    )
+
+    # About section captions
+    about_lines = (
+        f"X-Plane 12 NOAA Weather: {Conf.__VERSION__}",
+        '(c) antonio golfari 2023',
+    )
+    # About section link buttons, the first one is link_buttons_offset from the window right edge
+    link_button_width = 120
+    link_buttons_offset = 2 * window_margin + 2 * link_button_width + 20
+
+    # instance attributes, the window handlers read them on every event
+    __slots__ = (
+        'conf', 'weather', 'data', 'Mmenu', 'main_menu', 'metarWindowCMD', 'infoWindowCMD',
+        'flcounter', 'fltime', 'lastParse', 'newAptLoaded', 'status_time', 'status_data', 'reload_time',
+        # info window
+        'info_window', 'info_window_widget', 'info_captions', 'info_texts', 'infoWindowHandlerCB',
+        # METAR window
+        'metar_window', 'metar_window_widget', 'metarWindowHandlerCB', 'metarQueryInput', 'metarQueryInputHandlerCB',
+        'metarQueryButton', 'metar_source_caption', 'metarQueryOutput', 'RWQueryOutput', 'metar_pending',
+        # config window
+        'config_window', 'config_window_widget', 'configWindowHandlerCB', 'config_handlers', 'config_buttons',
+        'config_checks', 'check_states', 'input_texts', 'saved_values', 'metar_source_check', 'ignore_list_input',
+        'turbulenceCaption', 'turbulenceSlider', 'turbulence_position', 'turbulence_pct', 'turbulence_time',
+        'maxVisInput', 'maxCloudHeightInput', 'save_button', 'save_caption', 'dumplog_button', 'dump_caption',
+        'about_button', 'forum_button',
+        # config_rows checkboxes
+        'enable_check', 'decode_check', 'auto_check', 'rwxCheck', 'xp12MetarCheck', 'GFSCheck', 'snowCheck',
+        'rainCheck', 'windsCheck', 'cloudsCheck', 'optUpdCheck', 'tempCheck', 'pressureCheck', 'turbCheck',
+        'tropoCheck', 'thermalsCheck', 'surfaceCheck',
+    )
 
     def __init__(self):
         self.conf = Conf()
@@ -54,8 +164,16 @@ class Widget:
 
         self.info_window = False
         self.info_captions = []
+        # text shown in the status captions
+        self.info_texts = []
         self.metar_window = False
+        # METAR query response received while the window was hidden
+        self.metar_pending = None
         self.config_window = False
+        # checkbox and radio button states, updated by their events
+        self.check_states = {}
+        # text shown in the config text fields
+        self.input_texts = {}
 
         # Register commands
         self.metarWindowCMD = EasyCommand(
@@ -74,6 +192,12 @@ class Widget:
         self.flcounter = 0
         self.fltime = 1
         self.lastParse = 0
+        # last status redraw, monotonic time
+        self.status_time = 0
+        # weather data the status was last built from
+        self.status_data = None
+        # last Save, monotonic time, 0 when no reload countdown is running
+        self.reload_time = 0
 
         self.newAptLoaded = False
 
@@ -96,13 +220,13 @@ class Widget:
                 self.create_info_window()
             elif not xp.isWidgetVisible(self.info_window_widget):
                 xp.showWidget(self.info_window_widget)
+                self.updateStatus(force=True)
         elif menuItem == 2:
             # METAR query
             if not self.metar_window:
                 self.create_metar_window()
             elif not xp.isWidgetVisible(self.metar_window_widget):
-                xp.showWidget(self.metar_window_widget)
-                xp.setKeyboardFocus(self.metarQueryInput)
+                self.show_metar_window()
         elif menuItem == 3:
             # configuration
             if not self.config_window:
@@ -110,14 +234,23 @@ class Widget:
             elif not xp.isWidgetVisible(self.config_window_widget):
                 xp.showWidget(self.config_window_widget)
 
-    def create_info_window(self):
+    def prebuild_windows(self):
+        """Builds the info and config windows hidden, so the menu only has to show them"""
+        if not self.info_window:
+            self.create_info_window(visible=False)
+        if not self.config_window:
+            self.create_config_window(visible=False)
+
+    def create_info_window(self, visible: bool = True):
         x, y = self.conf.info_window_position
         x2 = x + self.info_width
         y2 = y - self.info_height
         top = y - self.line_height - self.window_margin
 
         # Create the Main Widget window
-        self.info_window_widget = xp.createWidget(x, y, x2, y2, 1, self.info_title, 1, 0, xp.WidgetClass_MainWindow)
+        self.info_window_widget = xp.createWidget(
+            x, y, x2, y2, int(visible), self.info_title, 1, 0, xp.WidgetClass_MainWindow
+        )
         window = self.info_window_widget
         xp.setWidgetProperty(window, xp.Property_MainWindowType, xp.MainWindowStyle_Translucent)
 
@@ -128,21 +261,22 @@ class Widget:
         xp.setWidgetProperty(window, xp.Property_MainWindowHasCloseBoxes, 1)
 
         # Create status captions
+        create, set_property, line_height = xp.createWidget, xp.setWidgetProperty, self.line_height
         while len(self.info_captions) < self.info_lines:
-            cap = xp.createWidget(x, y, x + 40, y - self.line_height, 1, '--', 0, window, xp.WidgetClass_Caption)
-            xp.setWidgetProperty(cap, xp.Property_CaptionLit, 1)
-            xp.setWidgetProperty(cap, xp.Property_Font, xp.Font_Basic)
+            cap = create(x, y, x + 40, y - line_height, 1, '--', 0, window, xp.WidgetClass_Caption)
+            set_property(cap, xp.Property_CaptionLit, 1)
+            set_property(cap, xp.Property_Font, xp.Font_Basic)
             self.info_captions.append(cap)
-            y -= self.line_height
+            self.info_texts.append('--')
+            y -= line_height
 
-        self.updateStatus()
+        self.info_window = True
+        self.updateStatus(force=True)
 
         # Register our widget handler
         self.infoWindowHandlerCB = self.infoWindowHandler
         xp.addWidgetCallback(window, self.infoWindowHandlerCB)
 
-        self.info_window = True
-
     def create_metar_window(self):
         x, y = self.conf.metar_window_position
         x2 = x + self.metar_width
@@ -154,7 +288,7 @@ class Widget:
 
         # Config Sub Window, style
         xp.setWidgetProperty(self.metar_window_widget, xp.Property_MainWindowHasCloseBoxes, 1)
-        x += 10
+        x += self.window_margin
         y -= self.line_height
 
         cap = xp.createWidget(x, y, x + 40, y - self.line_height, 1, 'Airport ICAO code:', 0, 
@@ -172,19 +306,21 @@ class Widget:
 
         y -= self.line_height * 2
         # Help caption
-        cap = xp.createWidget(x, y, x + 300, y - self.line_height, 1,
-                             f"{self.conf.metar_source}:", 0, self.metar_window_widget, xp.WidgetClass_Caption)
-        xp.setWidgetProperty(cap, xp.Property_CaptionLit, 1)
+        self.metar_source_caption = xp.createWidget(x, y, x + 300, y - self.line_height, 1,
+                                                    f"{self.conf.metar_source}:", 0, self.metar_window_widget,
+                                                    xp.WidgetClass_Caption)
+        xp.setWidgetProperty(self.metar_source_caption, xp.Property_CaptionLit, 1)
 
         y -= self.line_height
         # Query output
+        create, set_property = xp.createWidget, xp.setWidgetProperty
+        window, line_height, x2 = self.metar_window_widget, self.line_height, x + self.metar_widget_width
         self.metarQueryOutput = []
         for i in range(2):
-            l = xp.createWidget(x , y, x + self.metar_widget_width, y - self.line_height, 0, "", 0, 
-                                self.metar_window_widget, xp.WidgetClass_TextField)
-            xp.setWidgetProperty(l, xp.Property_TextFieldType, xp.TextTranslucent)
+            l = create(x, y, x2, y - line_height, 0, "", 0, window, xp.WidgetClass_TextField)
+            set_property(l, xp.Property_TextFieldType, xp.TextTranslucent)
             self.metarQueryOutput.append(l)
-            y -= self.line_height
+            y -= line_height
 
         y -= self.line_height
         cap = xp.createWidget(x, y, x + 300, y - self.line_height, 1, "XP12 Real Weather:", 0, 
@@ -194,11 +330,10 @@ class Widget:
         y -= self.line_height
         self.RWQueryOutput = []
         for i in range(2):
-            l = xp.createWidget(x, y, x + self.metar_widget_width, y - self.line_height, 0, "", 0, 
-                                self.metar_window_widget, xp.WidgetClass_TextField)
-            xp.setWidgetProperty(l, xp.Property_TextFieldType, xp.TextTranslucent)
+            l = create(x, y, x2, y - line_height, 0, "", 0, window, xp.WidgetClass_TextField)
+            set_property(l, xp.Property_TextFieldType, xp.TextTranslucent)
             self.RWQueryOutput.append(l)
-            y -= self.line_height
+            y -= line_height
 
         # Register our query widget handler
         self.metarQueryInputHandlerCB = self.metarQueryInputHandler
@@ -211,13 +346,15 @@ class Widget:
         xp.setKeyboardFocus(self.metarQueryInput)
         self.metar_window = True
 
-    def create_config_window(self):
+    def create_config_window(self, visible: bool = True):
         x, y = self.conf.config_window_position
         x2 = x + self.config_width
         y2 = y - self.config_height
 
         # Create the Main Widget window
-        self.config_window_widget = xp.createWidget(x, y, x2, y2, 1, self.config_title, 1, 0, xp.WidgetClass_MainWindow)
+        self.config_window_widget = xp.createWidget(
+            x, y, x2, y2, int(visible), self.config_title, 1, 0, xp.WidgetClass_MainWindow
+        )
         window = self.config_window_widget
 
         # Add Close Box decorations to Config Widget
@@ -234,248 +371,22 @@ class Widget:
         subw = xp.createWidget(r, t, l, b, 1, "", 0, window, xp.WidgetClass_SubWindow)
         xp.setWidgetProperty(subw, xp.Property_SubWindowType, xp.SubWindowStyle_SubWindow)
 
-        m = int(self.window_margin / 2)
-        top = t - m
-        x = r + m
-        y = top
-        cw = int((l - r - m) / 2)  # column width
-        xc = x + cw - self.line_height  # radio button column
-
-        # Main enable
-        xp.createWidget(x, y, x + 20, y - self.line_height, 1, 'Enable Plugin:', 0, window, xp.WidgetClass_Caption)
-        self.enable_check = xp.createWidget(
-            xc, y, xc + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-        )
-        xp.setWidgetProperty(self.enable_check, xp.Property_ButtonState, xp.RadioButton)
-        xp.setWidgetProperty(self.enable_check, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        xp.setWidgetProperty(self.enable_check, xp.Property_ButtonState, self.conf.enabled)
-        y -= self.line_height * 2
-
-        # METAR decoding
-        xp.createWidget(x, y, x + 20, y - self.line_height, 1, 'METAR Decoding:', 0, window, xp.WidgetClass_Caption)
-        self.decode_check = xp.createWidget(
-            xc, y, xc + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-        )
-        xp.setWidgetProperty(self.decode_check, xp.Property_ButtonState, xp.RadioButton)
-        xp.setWidgetProperty(self.decode_check, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        xp.setWidgetProperty(self.decode_check, xp.Property_ButtonState, self.conf.metar_decode)
-        y -= self.line_height
-
-        # Metar source radios
-        xp.createWidget(x, y, x + 100, y - self.line_height, 1, 'METAR SOURCE:', 0, window, xp.WidgetClass_Caption)
-
-        n = self.font_width * (len("NOAA ") + 1)
-        v = self.font_width * (len("VATSIM ") + 1)
-        x1 = xc - n * 2 - v - self.line_height * 4
-
-        xp.createWidget(x1, y, x1 + n, y - self.line_height, 1, 'NOAA', 0, window, xp.WidgetClass_Caption)
-        x1 += n
-        noaa_check = xp.createWidget(
-            x1, y, x1 + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-        )
-        x1 += self.line_height * 2
-        xp.createWidget(x1, y, x1 + n, y - self.line_height, 1, 'IVAO', 0, window, xp.WidgetClass_Caption)
-        x1 += n
-        ivao_check = xp.createWidget(
-            x1, y, x1 + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-        )
-        x1 += self.line_height * 2
-        xp.createWidget(x1, y, x1 + 40, y - self.line_height, 1, 'VATSIM', 0, window, xp.WidgetClass_Caption)
-        x1 += v
-        vatsim_check = xp.createWidget(
-            x1, y, x1 + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-        )
-
-        self.metar_source_check = {
-            noaa_check: 'NOAA',
-            ivao_check: 'IVAO',
-            vatsim_check: 'VATSIM'
-        }
-
-        for k, v in self.metar_source_check.items():
-            xp.setWidgetProperty(k, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(k, xp.Property_ButtonBehavior, xp.ButtonBehaviorRadioButton)
-            xp.setWidgetProperty(k, xp.Property_ButtonState, int(self.conf.metar_source == v))
-        y -= self.line_height
-
-        # Ignore automatically generated METAR sources
-        xp.createWidget(x, y, x + 100, y - self.line_height, 1, 'Ignore Metars with AUTO:', 0, window, xp.WidgetClass_Caption)
-        self.auto_check = xp.createWidget(
-            xc, y, xc + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-        )
-        xp.setWidgetProperty(self.auto_check, xp.Property_ButtonState, xp.RadioButton)
-        xp.setWidgetProperty(self.auto_check, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        xp.setWidgetProperty(self.auto_check, xp.Property_ButtonState, self.conf.metar_ignore_auto)
-        y -= self.line_height * 2
-
-        # List of METAR stations that will not be considered 
-        xp.createWidget(x, y, x + 100, y - self.line_height, 1, 'METAR Stations to be ignored:', 0, window, xp.WidgetClass_Caption)
-        y -= self.line_height
-        self.ignore_list_input = xp.createWidget(
-            x, y, xc, y - self.line_height, 1, ' '.join(self.conf.ignore_metar_stations), 0, window,
-            xp.WidgetClass_TextField
-        )
-        y-= self.line_height * 2
-
-        # Create METAR.rwx file
-        xp.createWidget(x, y, x + 200, y - self.line_height, 1, 'Create RWX file (READ the README file!):', 0, window, xp.WidgetClass_Caption)
-        self.rwxCheck = xp.createWidget(
-            xc, y, xc + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-        )
-        xp.setWidgetProperty(self.rwxCheck, xp.Property_ButtonState, xp.RadioButton)
-        xp.setWidgetProperty(self.rwxCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        xp.setWidgetProperty(self.rwxCheck, xp.Property_ButtonState, self.conf.update_rwx_file)
-        y -= self.line_height
-
-        # Use XP12 Real weather files to populate METAR.rwx file
-        xp.createWidget(x, y, x + 100, y - self.line_height, 1, 'Use Real Weather for RWX file:', 0, window, xp.WidgetClass_Caption)
-        self.xp12MetarCheck = xp.createWidget(
-            xc, y, xc + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-        )
-        xp.setWidgetProperty(self.xp12MetarCheck, xp.Property_ButtonState, xp.RadioButton)
-        xp.setWidgetProperty(self.xp12MetarCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        xp.setWidgetProperty(self.xp12MetarCheck, xp.Property_ButtonState, self.conf.metar_use_xp12)
-        y -= self.line_height * 2
-
-        # WAFS download enable
-        # xp.createWidget(x, y, x + 100, y - self.line_height, 1, 'WAFS download', 0, window, xp.WidgetClass_Caption)
-        # self.WAFSCheck = xp.createWidget(x + 120, y, x + 140, y - self.line_height, 1, '', 0, window, xpWidgetClass_Button)
-        # XPSetWidgetProperty(self.WAFSCheck, xp.Property_ButtonState, xp.RadioButton)
-        # XPSetWidgetProperty(self.WAFSCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        # XPSetWidgetProperty(self.WAFSCheck, xp.Property_ButtonState, self.conf.download_WAFS)
-        # y -= self.line_height * 2
-
-        # Download GFS Data
-        xp.createWidget(x, y, x + 100, y - self.line_height, 1, 'GFS data download:', 0, window, xp.WidgetClass_Caption)
-        self.GFSCheck = xp.createWidget(xc, y, xc + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-        xp.setWidgetProperty(self.GFSCheck, xp.Property_ButtonState, xp.RadioButton)
-        xp.setWidgetProperty(self.GFSCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        xp.setWidgetProperty(self.GFSCheck, xp.Property_ButtonState, self.conf.download_GFS)
-        y -= self.line_height
-
-        # Accumulated snow | water
-        xp.createWidget(x + 50, y, x + 150, y - self.line_height, 1, 'Accumulated Snow:', 0, window, xp.WidgetClass_Caption)
-        self.snowCheck = xp.createWidget(xc, y, xc + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-        xp.setWidgetProperty(self.snowCheck, xp.Property_ButtonState, xp.RadioButton)
-        xp.setWidgetProperty(self.snowCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        xp.setWidgetProperty(self.snowCheck, xp.Property_ButtonState, self.conf.set_snow)
-        y -= self.line_height
-
-        xp.createWidget(x + 50, y, x + 150, y - self.line_height, 1, 'Accumulated Water:', 0, window, xp.WidgetClass_Caption)
-        self.rainCheck = xp.createWidget(xc, y, xc + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-        xp.setWidgetProperty(self.rainCheck, xp.Property_ButtonState, xp.RadioButton)
-        xp.setWidgetProperty(self.rainCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-        xp.setWidgetProperty(self.rainCheck, xp.Property_ButtonState, self.conf.set_patches)
-        y -= self.line_height
+        # checkbox: conf attribute
+        self.config_checks = {}
+        x += self.config_left
+        y = t - self.config_sub_margin
 
+        rows = self.config_rows
         if not self.conf.use_real_weather_data:
-            # Winds enable
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Wind levels', 0, window, xp.WidgetClass_Caption)
-            self.windsCheck = xp.createWidget(
-                x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-            )
-            xp.setWidgetProperty(self.windsCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.windsCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.windsCheck, xp.Property_ButtonState, self.conf.set_wind)
-            y -= self.line_height
-
-            # Clouds enable
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Cloud levels', 0, window, xp.WidgetClass_Caption)
-            self.cloudsCheck = xp.createWidget(
-                x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-            )
-            xp.setWidgetProperty(self.cloudsCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.cloudsCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.cloudsCheck, xp.Property_ButtonState, self.conf.set_clouds)
-            y -= self.line_height
-
-            # Optimised clouds layers update for liners
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Opt. redraw', 0, window, xp.WidgetClass_Caption)
-            self.optUpdCheck = xp.createWidget(
-                x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
-            )
-            xp.setWidgetProperty(self.optUpdCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.optUpdCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.optUpdCheck, xp.Property_ButtonState, self.conf.opt_clouds_update)
-            y -= self.line_height
-
-            # Temperature enable
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Temperature', 0, window, xp.WidgetClass_Caption)
-            self.tempCheck = xp.createWidget(x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-            xp.setWidgetProperty(self.tempCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.tempCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.tempCheck, xp.Property_ButtonState, self.conf.set_temp)
-            y -= self.line_height
-
-            # Pressure enable
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Pressure', 0, window, xp.WidgetClass_Caption)
-            self.pressureCheck = xp.createWidget(x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-            xp.setWidgetProperty(self.pressureCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.pressureCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.pressureCheck, xp.Property_ButtonState, self.conf.set_pressure)
-            y -= self.line_height
-
-            # Turbulence enable
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Turbulence', 0, window, xp.WidgetClass_Caption)
-            self.turbCheck = xp.createWidget(x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-            xp.setWidgetProperty(self.turbCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.turbCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.turbCheck, xp.Property_ButtonState, self.conf.set_turb)
-            y -= self.line_height
-
-            self.turbulenceCaption = xp.createWidget(
-                x + 5, y, x + 80, y - self.line_height, 
-                1, f"Turbulence prob.  {self.conf.turbulence_probability * 100}%", 0, window, 
-                xp.WidgetClass_Caption
-            )
-            self.turbulenceSlider = xp.createWidget(
-                x + 10, y - self.line_height, x + 160, y - 40, 1, '', 0, window, xp.WidgetClass_ScrollBar
-            )
-            xp.setWidgetProperty(self.turbulenceSlider, xp.Property_ScrollBarType, xp.ScrollBarTypeSlider)
-            xp.setWidgetProperty(self.turbulenceSlider, xp.Property_ScrollBarMin, 10)
-            xp.setWidgetProperty(self.turbulenceSlider, xp.Property_ScrollBarMax, 1000)
-            xp.setWidgetProperty(self.turbulenceSlider, xp.Property_ScrollBarPageAmount, 1)
-            xp.setWidgetProperty(
-                self.turbulenceSlider, 
-                xp.Property_ScrollBarSliderPosition, int(self.conf.turbulence_probability * 1000)
-            )
-            y -= self.line_height * 2
-
-            # Tropo enable
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Tropo Temp', 0, window, xp.WidgetClass_Caption)
-            self.tropoCheck = xp.createWidget(x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-            xp.setWidgetProperty(self.tropoCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.tropoCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.tropoCheck, xp.Property_ButtonState, self.conf.set_tropo)
-            y -= self.line_height
-
-            # Thermals enable
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Thermals', 0, window, xp.WidgetClass_Caption)
-            self.thermalsCheck = xp.createWidget(x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-            xp.setWidgetProperty(self.thermalsCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.thermalsCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.thermalsCheck, xp.Property_ButtonState, self.conf.set_thermals)
-            y -= self.line_height
-
-            # Surface Wind Layer enable
-            xp.createWidget(x + 5, y, x + 20, y - self.line_height, 1, 'Surface Wind', 0, window, xp.WidgetClass_Caption)
-            self.surfaceCheck = xp.createWidget(x + 110, y, x + 120, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button)
-            xp.setWidgetProperty(self.surfaceCheck, xp.Property_ButtonState, xp.RadioButton)
-            xp.setWidgetProperty(self.surfaceCheck, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
-            xp.setWidgetProperty(self.surfaceCheck, xp.Property_ButtonState, self.conf.set_surface_layer)
-            y -= self.line_height * 2
-
-            # Performance Tweaks
-            xp.createWidget(x, y, x + 80, y - self.line_height, 1, 'Performance Tweaks', 0, window, xp.WidgetClass_Caption)
-            xp.createWidget(x + 5, y - self.line_height, x + 80, y - 40, 1, 'Max Visibility (sm)', 0, window, xp.WidgetClass_Caption)
-            self.maxVisInput = xp.createWidget(x + 119, y - self.line_height, x + 160, y - 40, 1,
-                                               c.convertForInput(self.conf.max_visibility, 'm2sm'), 0, window,
-                                               xp.WidgetClass_TextField)
-            y -= self.line_height * 2
-            xp.createWidget(x + 5, y, x + 80, y - self.line_height, 1, 'Max cloud height (ft)', 0, window, xp.WidgetClass_Caption)
-            self.maxCloudHeightInput = xp.createWidget(x + 119, y, x + 160, y - self.line_height, 1,
-                                                       c.convertForInput(self.conf.max_cloud_height, 'm2ft'), 0, window,
-                                                       xp.WidgetClass_TextField)
+            rows += self.config_legacy_rows
+        styles, create_check, line_height = self.config_check_styles, self.create_config_check, self.line_height
+        for kind, lines, *args in rows:
+            style = styles.get(kind)
+            if style:
+                create_check(window, x, y, style, *args)
+            else:
+                getattr(self, f"create_config_{kind}")(window, x, y)
+            y -= line_height * lines
 
         # elements to add at the bottom of the subwindow
         y1 = b + self.line_height * 4
@@ -507,17 +418,13 @@ class Widget:
         # Set the style to sub window
 
         y = t - self.window_margin
-        sysinfo = [
-            f"X-Plane 12 NOAA Weather: {self.conf.__VERSION__}",
-            '(c) antonio golfari 2023',
-        ]
-        for label in sysinfo:
+        for label in self.about_lines:
             xp.createWidget(x, y, x + 120, y - self.line_height, 1, label, 0, window, xp.WidgetClass_Caption)
             y -= self.line_height
 
         # Visit site Button
-        button_width = 120
-        x1 = l - self.window_margin - button_width * 2 - 20
+        button_width = self.link_button_width
+        x1 = x2 - self.link_buttons_offset
         y1 = b + self.window_margin + self.line_height
         self.about_button = xp.createWidget(
             x1, y1, x1 + button_width, y1 - self.line_height, 1, "Official site", 0, window, xp.WidgetClass_Button
@@ -528,12 +435,123 @@ class Widget:
             x1, y1, x1 + button_width, y1 - self.line_height, 1, "Support", 0, window, xp.WidgetClass_Button
         )
 
-        # Register our widget handler
+        # push buttons actions
+        self.config_buttons = {
+            self.about_button: self.on_about,
+            self.forum_button: self.on_forum,
+            self.save_button: self.on_save,
+            self.dumplog_button: self.on_dumplog,
+        }
+
+        # Register our widget handler, dispatching by message
+        self.config_handlers = {
+            xp.Message_CloseButtonPushed: self.on_config_close,
+            xp.Msg_ButtonStateChanged: self.on_config_button_state,
+            xp.Msg_ScrollBarSliderPositionChanged: self.on_config_slider,
+            xp.Msg_PushButtonPressed: self.on_config_push,
+        }
         self.configWindowHandlerCB = self.configWindowHandler
         xp.addWidgetCallback(window, self.configWindowHandlerCB)
 
+        # some checkboxes apply to conf right away, on_save compares against the last saved values
+        self.saved_values = self.config_snapshot()
         self.config_window = True
 
+    def create_config_check(self, window, x: int, y: int, style: tuple, attr: str, caption: str, conf_attr: str):
+        """Creates a config window checkbox showing a conf attribute, stores it in attr
+        style is a config_check_styles geometry
+        """
+        cx, cw, bx, bw = style
+        checkbox = self.create_checkbox(
+            window, y, (x + cx, x + cx + cw), (x + bx, x + bx + bw), caption, getattr(self.conf, conf_attr)
+        )
+        setattr(self, attr, checkbox)
+        self.config_checks[checkbox] = conf_attr
+
+    def create_config_metar_source(self, window, x: int, y: int):
+        xp.createWidget(x, y, x + 100, y - self.line_height, 1, 'METAR SOURCE:', 0, window, xp.WidgetClass_Caption)
+
+        self.metar_source_check = {}
+        for source, xl, width, xb in self.metar_source_radios:
+            xp.createWidget(x + xl, y, x + xl + width, y - self.line_height, 1, source, 0, window,
+                            xp.WidgetClass_Caption)
+            radio = xp.createWidget(
+                x + xb, y, x + xb + self.line_height, y - self.line_height, 1, '', 0, window, xp.WidgetClass_Button
+            )
+            self.metar_source_check[radio] = source
+
+        for k, v in self.metar_source_check.items():
+            xp.setWidgetProperty(k, xp.Property_ButtonState, xp.RadioButton)
+            xp.setWidgetProperty(k, xp.Property_ButtonBehavior, xp.ButtonBehaviorRadioButton)
+            self.set_check(k, self.conf.metar_source == v)
+
+    def create_config_ignore_list(self, window, x: int, y: int):
+        # List of METAR stations that will not be considered
+        xp.createWidget(x, y, x + 100, y - self.line_height, 1, 'METAR Stations to be ignored:', 0, window, xp.WidgetClass_Caption)
+        y -= self.line_height
+        text = ' '.join(self.conf.ignore_metar_stations)
+        self.ignore_list_input = xp.createWidget(
+            x, y, x + self.config_check_x, y - self.line_height, 1, text, 0, window, xp.WidgetClass_TextField
+        )
+        self.input_texts[self.ignore_list_input] = text
+
+    def create_config_turbulence(self, window, x: int, y: int):
+        self.turbulenceCaption = xp.createWidget(
+            x + 5, y, x + 80, y - self.line_height,
+            1, f"Turbulence prob.  {self.conf.turbulence_probability * 100}%", 0, window,
+            xp.WidgetClass_Caption
+        )
+        self.turbulenceSlider = xp.createWidget(
+            x + 10, y - self.line_height, x + 160, y - 40, 1, '', 0, window, xp.WidgetClass_ScrollBar
+        )
+        for prop, value in self.turbulence_slider_properties:
+            xp.setWidgetProperty(self.turbulenceSlider, prop, value)
+        self.turbulence_position = int(self.conf.turbulence_probability * 1000)
+        # percentage shown in the caption and its last redraw, set on the first slider move
+        self.turbulence_pct = None
+        self.turbulence_time = 0
+        xp.setWidgetProperty(self.turbulenceSlider, xp.Property_ScrollBarSliderPosition, self.turbulence_position)
+
+    def create_config_performance(self, window, x: int, y: int):
+        # Performance Tweaks
+        xp.createWidget(x, y, x + 80, y - self.line_height, 1, 'Performance Tweaks', 0, window, xp.WidgetClass_Caption)
+        xp.createWidget(x + 5, y - self.line_height, x + 80, y - 40, 1, 'Max Visibility (sm)', 0, window, xp.WidgetClass_Caption)
+        self.maxVisInput = xp.createWidget(x + 119, y - self.line_height, x + 160, y - 40, 1,
+                                           '', 0, window, xp.WidgetClass_TextField)
+        y -= self.line_height * 2
+        xp.createWidget(x + 5, y, x + 80, y - self.line_height, 1, 'Max cloud height (ft)', 0, window, xp.WidgetClass_Caption)
+        self.maxCloudHeightInput = xp.createWidget(x + 119, y, x + 160, y - self.line_height, 1,
+                                                   '', 0, window, xp.WidgetClass_TextField)
+        self.set_input(self.maxVisInput, c.convertForInput(self.conf.max_visibility, 'm2sm'))
+        self.set_input(self.maxCloudHeightInput, c.convertForInput(self.conf.max_cloud_height, 'm2ft'))
+
+    def create_checkbox(self, window, y: int, caption: tuple[int, int], button: tuple[int, int], label: str, state) -> int:
+        """Creates a captioned checkbox, caption and button are (left, right) coordinates"""
+        create, set_property = xp.createWidget, xp.setWidgetProperty
+        bottom = y - self.line_height
+        create(caption[0], y, caption[1], bottom, 1, label, 0, window, xp.WidgetClass_Caption)
+        checkbox = create(button[0], y, button[1], bottom, 1, '', 0, window, xp.WidgetClass_Button)
+        set_property(checkbox, xp.Property_ButtonState, xp.RadioButton)
+        set_property(checkbox, xp.Property_ButtonBehavior, xp.ButtonBehaviorCheckBox)
+        self.set_check(checkbox, state)
+        return checkbox
+
+    def set_input(self, field, text: str):
+        """Sets a text field, keeping track of the text shown"""
+        xp.setWidgetDescriptor(field, text)
+        self.input_texts[field] = text
+
+    def input_changed(self, field) -> str | None:
+        """Returns the text field content if the user edited it, None otherwise"""
+        text = xp.getWidgetDescriptor(field)
+        return text if text != self.input_texts.get(field) else None
+
+    def set_check(self, button, state):
+        """Sets a checkbox or radio button state, keeping track of it"""
+        state = int(state)
+        xp.setWidgetProperty(button, xp.Property_ButtonState, state)
+        self.check_states[button] = state
+
     def infoWindowHandler(self, inMessage, inWidget, inParam1, inParam2):
         if inMessage == xp.Message_CloseButtonPushed:
             if self.info_window:
@@ -542,159 +560,155 @@ class Widget:
         return 0
 
     def configWindowHandler(self, inMessage, inWidget, inParam1, inParam2):
-        # About window events
-        if inMessage == xp.Message_CloseButtonPushed:
-            if self.config_window:
-                xp.hideWidget(self.config_window_widget)
-            return 1
+        handler = self.config_handlers.get(inMessage)
+        return handler(inParam1, inParam2) if handler else 0
 
-        if inMessage == xp.Msg_ButtonStateChanged and inParam1 in self.metar_source_check:
-            if inParam2:
-                for i in self.metar_source_check:
-                    if i != inParam1:
-                        xp.setWidgetProperty(i, xp.Property_ButtonState, 0)
-            else:
-                xp.setWidgetProperty(inParam1, xp.Property_ButtonState, 1)
+    def on_config_close(self, inParam1, inParam2):
+        # the window is only hidden, the menu shows it again
+        if self.config_window:
+            xp.hideWidget(self.config_window_widget)
+        return 1
+
+    def on_config_button_state(self, inParam1, inParam2):
+        self.check_states[inParam1] = inParam2
+
+        if inParam1 in self.metar_source_check:
+            # the clicked radio stays selected even when clicked again
+            for radio in self.metar_source_check:
+                self.set_check(radio, radio == inParam1)
             return 1
 
-        if inMessage == xp.Msg_ButtonStateChanged and inParam1 == self.decode_check:
-            self.conf.metar_decode = xp.getWidgetProperty(self.decode_check, xp.Property_ButtonState)
+        if inParam1 == self.decode_check:
+            self.conf.metar_decode = inParam2
             return 1
+        return 0
 
-        if inMessage == xp.Msg_ScrollBarSliderPositionChanged and inParam1 == self.turbulenceSlider:
-            val = xp.getWidgetProperty(self.turbulenceSlider, xp.Property_ScrollBarSliderPosition, None)
-            xp.setWidgetDescriptor(self.turbulenceCaption, f"Turbulence probability {round(val/10)}%")
+    def on_config_slider(self, inParam1, inParam2):
+        if inParam1 == self.turbulenceSlider:
+            self.turbulence_position = xp.getWidgetProperty(
+                self.turbulenceSlider, xp.Property_ScrollBarSliderPosition, None
+            )
+            # a drag fires an event per pixel, updateStatus shows the moves skipped here
+            if time.monotonic() - self.turbulence_time >= self.slider_interval:
+                self.update_turbulence_caption()
             return 1
+        return 0
+
+    def update_turbulence_caption(self):
+        """Shows the turbulence slider position in its caption, if the percentage changed"""
+        pct = round(self.turbulence_position / 10)
+        if pct != self.turbulence_pct:
+            # a drag moves the slider by a few units per event, the caption changes every 10
+            self.turbulence_pct = pct
+            self.turbulence_time = time.monotonic()
+            xp.setWidgetDescriptor(self.turbulenceCaption, self.turbulence_labels[pct])
 
+    def on_config_push(self, inParam1, inParam2):
         # Handle any button pushes
-        if inMessage == xp.Msg_PushButtonPressed:
+        handler = self.config_buttons.get(inParam1)
+        return handler() if handler else 0
 
-            if inParam1 == self.about_button:
-                from webbrowser import open_new
-                open_new('https://github.com/biuti/XplaneNoaaWeather')
-                return 1
-            if inParam1 == self.forum_button:
-                from webbrowser import open_new
-                open_new(
-                    'http://forums.x-plane.org/index.php?/forums/topic/72313-noaa-weather-plugin/&do=getNewComment')
-                return 1
-            if inParam1 == self.save_button:
-                # Save configuration
-                self.conf.enabled = xp.getWidgetProperty(self.enable_check, xp.Property_ButtonState, None)
-                self.conf.metar_decode = xp.getWidgetProperty(self.decode_check, xp.Property_ButtonState)
-                if self.conf.use_real_weather_data:
-                    self.conf.download_GFS = xp.getWidgetProperty(self.GFSCheck, xp.Property_ButtonState, None)
-                    # self.conf.download_WAFS = xp.getWidgetProperty(self.WAFSCheck, xp.Property_ButtonState, None)
-                    self.conf.set_snow = xp.getWidgetProperty(self.snowCheck, xp.Property_ButtonState, None)
-                    self.conf.set_patches = xp.getWidgetProperty(self.rainCheck, xp.Property_ButtonState, None)
-                    # pass
-                else:
-                    self.conf.set_wind = xp.getWidgetProperty(self.windsCheck, xp.Property_ButtonState, None)
-                    self.conf.set_clouds = xp.getWidgetProperty(self.cloudsCheck, xp.Property_ButtonState, None)
-                    self.conf.opt_clouds_update = xp.getWidgetProperty(self.optUpdCheck, xp.Property_ButtonState, None)
-                    self.conf.set_temp = xp.getWidgetProperty(self.tempCheck, xp.Property_ButtonState, None)
-                    self.conf.set_pressure = xp.getWidgetProperty(self.pressureCheck, xp.Property_ButtonState, None)
-                    self.conf.set_tropo = xp.getWidgetProperty(self.tropoCheck, xp.Property_ButtonState, None)
-                    self.conf.set_thermals = xp.getWidgetProperty(self.thermalsCheck, xp.Property_ButtonState, None)
-                    self.conf.set_surface_layer = xp.getWidgetProperty(self.surfaceCheck, xp.Property_ButtonState, None)
-                    self.conf.turbulence_probability = xp.getWidgetProperty(self.turbulenceSlider,
-                                                                           xp.Property_ScrollBarSliderPosition,
-                                                                           None) / 1000.0
-                    # Zero turbulence data if disabled
-                    self.conf.set_turb = xp.getWidgetProperty(self.turbCheck, xp.Property_ButtonState, None)
-                    if not self.conf.set_turb:
-                        for i in range(3):
-                            self.data.winds[i]['turb'].value = 0
-
-                    buff = xp.getWidgetDescriptor(self.maxCloudHeightInput)
-                    self.conf.max_cloud_height = c.convertFromInput(buff, 'f2m', min=c.f2m(2000))
-
-                    buff = xp.getWidgetDescriptor(self.maxVisInput)
-                    self.conf.max_visibility = c.convertFromInput(buff, 'sm2m')
-
-                # Metar station ignore
-                buff = xp.getWidgetDescriptor(self.ignore_list_input)
-                ignore_stations = []
-                for icao in buff.split(' '):
-                    if len(icao) == 4:
-                        ignore_stations.append(icao.upper())
-
-                self.conf.metar_ignore_auto = xp.getWidgetProperty(self.auto_check, xp.Property_ButtonState, None)
-                self.conf.ignore_metar_stations = ignore_stations
-
-                # Check metar source
-                prev_metar_source = self.conf.metar_source
-                for check in self.metar_source_check:
-                    if xp.getWidgetProperty(check, xp.Property_ButtonState, None):
-                        self.conf.metar_source = self.metar_source_check[check]
-
-                # Check METAR.rwx file
-                prev_rwx = self.conf.update_rwx_file
-                self.conf.update_rwx_file = xp.getWidgetProperty(self.rwxCheck, xp.Property_ButtonState, None)
-
-                # Check METAR.rwx source
-                prev_file_source = self.conf.metar_use_xp12
-                self.conf.metar_use_xp12 = xp.getWidgetProperty(self.xp12MetarCheck, xp.Property_ButtonState, None)
-
-                # Save config and tell server to reload it
-                self.conf.pluginSave()
-                xp.log(f"Config saved. Weather client reloading ...")
-                self.weather.weatherClientSend('!reload')
-
-                # If metar source has changed tell server to reinit metar database
-                if self.conf.metar_source != prev_metar_source:
-                    if self.metar_window:
-                        # update metar source label
-                        xp.destroyWidget(self.metar_window_widget, 1)
-                        self.metar_window = False
-                    self.weather.weatherClientSend('!resetMetar')
-
-                # If metar source for METAR.rwx file has changed tell server to reinit rwmetar database
-                if self.conf.update_rwx_file != prev_rwx or self.conf.metar_use_xp12 != prev_file_source:
-                    self.weather.weatherClientSend('!resetRWMetar')
-
-                self.weather.startWeatherClient()
-                self.configWindowUpdate()
-
-                # Reset things
-                self.weather.newData = True
-                self.newAptLoaded = True
+    def on_about(self):
+        open_new('https://github.com/biuti/XplaneNoaaWeather')
+        return 1
 
-                return 1
+    def on_forum(self):
+        open_new('http://forums.x-plane.org/index.php?/forums/topic/72313-noaa-weather-plugin/&do=getNewComment')
+        return 1
 
-            if inParam1 == self.dumplog_button:
-                dumpfile = self.weather.dumpLog()
-                xp.setWidgetDescriptor(self.dump_caption, f"created {dumpfile.name} in cache folder")
-                return 1
-        return 0
+    def on_dumplog(self):
+        dumpfile = self.weather.dumpLog()
+        xp.setWidgetDescriptor(self.dump_caption, f"created {dumpfile.name} in cache folder")
+        return 1
+
+    def on_save(self):
+        """Saves the configuration, the server reloads it only if something changed"""
+        prev_metar_source = self.conf.metar_source
+        prev_rwx = self.conf.update_rwx_file
+        prev_file_source = self.conf.metar_use_xp12
+
+        # checkbox states are tracked from their events, no need to query the widgets
+        for check, conf_attr in self.config_checks.items():
+            setattr(self.conf, conf_attr, self.check_states[check])
+
+        if not self.conf.use_real_weather_data:
+            self.conf.turbulence_probability = self.turbulence_position / 1000.0
+            # Zero turbulence data if disabled
+            if not self.conf.set_turb:
+                turb = self.data.winds['turb']
+                turb.value = [0.0] * turb.count
+
+            # converting the shown values back would round them, parse only the edited ones
+            buff = self.input_changed(self.maxCloudHeightInput)
+            if buff is not None:
+                self.conf.max_cloud_height = c.convertFromInput(buff, 'f2m', min=c.f2m(2000))
+
+            buff = self.input_changed(self.maxVisInput)
+            if buff is not None:
+                self.conf.max_visibility = c.convertFromInput(buff, 'sm2m')
+
+        # Metar station ignore
+        buff = self.input_changed(self.ignore_list_input)
+        if buff is not None:
+            self.conf.ignore_metar_stations = [icao.upper() for icao in self.RE_ICAO.findall(buff)]
+
+        # Check metar source
+        for check, source in self.metar_source_check.items():
+            if self.check_states[check]:
+                self.conf.metar_source = source
+
+        values = self.config_snapshot()
+        if values == self.saved_values:
+            # nothing changed, no need to reload the server and restart the client
+            self.configWindowUpdate()
+            return 1
+
+        # Save config and tell server to reload it
+        self.conf.pluginSave()
+        self.saved_values = values
+        self.reload_time = time.monotonic()
+        xp.log(f"Config saved. Weather client reloading ...")
+        self.weather.weatherClientSend('!reload')
+
+        # If metar source has changed tell server to reinit metar database
+        if self.conf.metar_source != prev_metar_source:
+            if self.metar_window:
+                # update metar source label
+                xp.setWidgetDescriptor(self.metar_source_caption, f"{self.conf.metar_source}:")
+            self.weather.weatherClientSend('!resetMetar')
+
+        # If metar source for METAR.rwx file has changed tell server to reinit rwmetar database
+        if self.conf.update_rwx_file != prev_rwx or self.conf.metar_use_xp12 != prev_file_source:
+            self.weather.weatherClientSend('!resetRWMetar')
+
+        self.weather.startWeatherClient()
+        self.configWindowUpdate()
+
+        # Reset things
+        self.weather.newData = True
+        self.newAptLoaded = True
+
+        return 1
+
+    def config_snapshot(self) -> list:
+        """Returns the conf values set by the config window"""
+        return [getattr(self.conf, attr) for attr in (*self.config_checks.values(), *self.config_values)]
 
     def configWindowUpdate(self):
 
-        xp.setWidgetProperty(self.enable_check, xp.Property_ButtonState, self.conf.enabled)
-        xp.setWidgetProperty(self.decode_check, xp.Property_ButtonState, self.conf.metar_decode)
-        xp.setWidgetDescriptor(self.ignore_list_input, ' '.join(self.conf.ignore_metar_stations))
-        xp.setWidgetProperty(self.auto_check, xp.Property_ButtonState, self.conf.metar_ignore_auto)
-        xp.setWidgetProperty(self.rwxCheck, xp.Property_ButtonState, self.conf.update_rwx_file)
-        xp.setWidgetProperty(self.xp12MetarCheck, xp.Property_ButtonState, self.conf.metar_use_xp12)
+        # only touch the checkboxes not showing the conf value
+        check_states = self.check_states
+        for check, conf_attr in self.config_checks.items():
+            state = int(getattr(self.conf, conf_attr))
+            if check_states.get(check) != state:
+                self.set_check(check, state)
+        self.set_input(self.ignore_list_input, ' '.join(self.conf.ignore_metar_stations))
 
-        if self.conf.use_real_weather_data:
-            # xp.setWidgetProperty(self.WAFSCheck, xp.Property_ButtonState, self.conf.download_WAFS)
-            xp.setWidgetProperty(self.snowCheck, xp.Property_ButtonState, self.conf.set_snow)
-            xp.setWidgetProperty(self.rainCheck, xp.Property_ButtonState, self.conf.set_patches)
+        if not self.conf.use_real_weather_data:
+            self.set_input(self.maxVisInput, c.convertForInput(self.conf.max_visibility, 'm2sm'))
+            self.set_input(self.maxCloudHeightInput, c.convertForInput(self.conf.max_cloud_height, 'm2ft'))
 
-        else:
-            xp.setWidgetProperty(self.windsCheck, xp.Property_ButtonState, self.conf.set_wind)
-            xp.setWidgetProperty(self.cloudsCheck, xp.Property_ButtonState, self.conf.set_clouds)
-            xp.setWidgetProperty(self.optUpdCheck, xp.Property_ButtonState, self.conf.opt_clouds_update)
-            xp.setWidgetProperty(self.tempCheck, xp.Property_ButtonState, self.conf.set_temp)
-            xp.setWidgetProperty(self.turbCheck, xp.Property_ButtonState, self.conf.set_turb)
-            xp.setWidgetProperty(self.tropoCheck, xp.Property_ButtonState, self.conf.set_tropo)
-            xp.setWidgetProperty(self.thermalsCheck, xp.Property_ButtonState, self.conf.set_thermals)
-            xp.setWidgetProperty(self.surfaceCheck, xp.Property_ButtonState, self.conf.set_surface_layer)
-            xp.setWidgetDescriptor(self.maxVisInput, c.convertForInput(self.conf.max_visibility, 'm2sm'))
-            xp.setWidgetDescriptor(self.maxCloudHeightInput, c.convertForInput(self.conf.max_cloud_height, 'm2ft'))
-
-        self.updateStatus()
+        self.updateStatus(force=True)
 
     def save_windows_position(self):
         """ Gets position of the windows and saves it in conf"""
@@ -704,24 +718,45 @@ class Widget:
             self.conf.metar_window_position = xp.getWidgetGeometry(self.metar_window_widget)[:2]
         if self.config_window:
             self.conf.config_window_position = xp.getWidgetGeometry(self.config_window_widget)[:2]
-        xp.log(f"saved positions: {self.conf.info_window_position}, {self.conf.metar_window_position}, {self.conf.config_window_position}")
-
-    def updateStatus(self):
-        """Updates status window"""
-
-        sysinfo = self.weather.weatherInfo(self.info_line_chars)
-
-        for line in self.info_captions:
-            label = sysinfo.pop(0) if len(sysinfo) else '--'
-            xp.setWidgetDescriptor(line, label)
-
-        text = ""
-        if self.conf.settingsfile.is_file() and self.config_window:
-            d = int(time.time() - self.conf.settingsfile.stat().st_mtime)
-            if d < 15:
-                text = f"Reloading ({15 - d} sec.) ..."
+        if self.conf.verbose:
+            xp.log(f"saved positions: {self.conf.info_window_position}, {self.conf.metar_window_position}, {self.conf.config_window_position}")
+
+    def updateStatus(self, force: bool = False):
+        """Updates status window, at most every status_interval seconds unless forced or new data arrived"""
+        now = time.monotonic()
+        data = self.weather.weatherData
+        if not force and now - self.status_time < self.status_interval and data is self.status_data:
+            return
+        self.status_time = now
+        self.status_data = data
+
+        # a hidden info window doesn't need the weather info, the config window may still need the countdown
+        if self.info_window and xp.isWidgetVisible(self.info_window_widget):
+            sysinfo = self.weather.weatherInfo(self.info_line_chars)
+
+            # pad to the captions count and only push the lines that changed
+            lines = len(self.info_captions)
+            labels = sysinfo[:lines]
+            labels += ['--'] * (lines - len(labels))
+            for caption, shown, label in zip(self.info_captions, self.info_texts, labels):
+                if label != shown:
+                    xp.setWidgetDescriptor(caption, label)
+            self.info_texts = labels
+
+        # reload countdown, cleared once when it expires
+        if self.reload_time and self.config_window:
+            elapsed = int(now - self.reload_time)
+            if elapsed < self.reload_seconds:
+                text = f"Reloading ({self.reload_seconds - elapsed} sec.) ..."
+            else:
+                text = ""
+                self.reload_time = 0
             xp.setWidgetDescriptor(self.save_caption, text)
 
+        # last turbulence slider move, if it came right after a caption redraw
+        if self.config_window and not self.conf.use_real_weather_data and self.turbulence_pct is not None:
+            self.update_turbulence_caption()
+
     def metarQueryInputHandler(self, inMessage, inWidget, inParam1, inParam2):
         """Override Texfield keyboard input to be more friendly"""
         if inMessage == xp.Msg_KeyPress:
@@ -729,6 +764,9 @@ class Widget:
             key, flags, vkey = inParam1
 
             if flags == 8:
+                if key not in self.metar_edit_keys and key not in self.icao_keys:
+                    # nothing to edit, no need to read the field
+                    return 1
                 cursor = xp.getWidgetProperty(self.metarQueryInput, xp.Property_EditFieldSelStart, None)
                 text = xp.getWidgetDescriptor(self.metarQueryInput).strip()
                 if key in (8, 127):
@@ -741,8 +779,8 @@ class Widget:
                 elif key == 27:
                     # ESC
                     xp.loseKeyboardFocus(self.metarQueryInput)
-                elif 48 <= key <= 57 or 65 <= key <= 90 or 97 <= key <= 122 and len(text) < 4:
-                    text += chr(key).upper()
+                elif key in self.icao_keys and len(text) < 4:
+                    text += self.icao_keys[key]
                     xp.setWidgetDescriptor(self.metarQueryInput, text)
                     cursor += 1
 
@@ -790,15 +828,23 @@ class Widget:
         else:
             xp.setWidgetDescriptor(self.metarQueryOutput[0], 'Please insert a valid ICAO code.')
 
+    def show_metar_window(self):
+        xp.showWidget(self.metar_window_widget)
+        xp.setKeyboardFocus(self.metarQueryInput)
+        if self.metar_pending:
+            self.metarQueryCallback(self.metar_pending)
+
     def metarQueryCallback(self, msg):
-        """Callback for metar queries"""
+        """Callback for metar queries, responses for a hidden window are filed when it's shown"""
 
         if self.metar_window:
+            if not xp.isWidgetVisible(self.metar_window_widget):
+                self.metar_pending = msg
+                return
+            self.metar_pending = None
             # Filter metar text
-            metar = util.format_text(''.join(filter(lambda x: x in self.conf.printableChars, msg['metar']['metar'])), 
-                                          self.metar_line_chars)
-            rwmetar = util.format_text(''.join(filter(lambda x: x in self.conf.printableChars, msg['rwmetar']['metar'])), 
-                                            self.metar_line_chars)
+            metar = util.format_text(self.printable(msg['metar']['metar']), self.metar_line_chars)
+            rwmetar = util.format_text(self.printable(msg['rwmetar']['metar']), self.metar_line_chars)
             # adding source and RW METARs
             for i, line in enumerate(self.metarQueryOutput):
                 if len(metar) > i:
@@ -808,14 +854,21 @@ class Widget:
                 if len(rwmetar) > i:
                     self.file_metar_line(self.RWQueryOutput[i], f"{rwmetar[i]}")
 
+    @staticmethod
+    def printable(text: str) -> str:
+        """Drops the characters not in Conf.printableChars, non ASCII ones included"""
+        if text.isascii() and text.isprintable():
+            # printableChars are exactly the printable ASCII characters, the usual METAR needs no copy
+            return text
+        return text.encode('ascii', 'ignore').decode('ascii').translate(Conf.unprintable_table)
+
     def metarQueryWindowToggle(self):
         """Metar window toggle command"""
         if self.metar_window:
             if xp.isWidgetVisible(self.metar_window_widget):
                 xp.hideWidget(self.metar_window_widget)
             else:
-                xp.showWidget(self.metar_window_widget)
-                xp.setKeyboardFocus(self.metarQueryInput)
+                self.show_metar_window()
         else:
             self.create_metar_window()
 
@@ -826,6 +879,7 @@ class Widget:
                 xp.hideWidget(self.info_window_widget)
             else:
                 xp.showWidget(self.info_window_widget)
+                self.updateStatus(force=True)
         else:
             self.create_info_window()
 